@@ -0,0 +1,344 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import faiss
+import numpy as np
+from indexes import configure_index, prepare_vectors, to_l2_distances
+
+# Bump when the on-disk layout changes; readers refuse bundles they do not know
+FORMAT_VERSION = 2
+# 1: one answer string per question; 2: unique answers + answer_ids.npy
+SUPPORTED_VERSIONS = (1, 2)
+MANIFEST = "manifest.json"
+
+# A generation root holds gen-NNNNNN bundle directories and a CURRENT file naming the live one
+CURRENT = "CURRENT"
+GENERATION_PREFIX = "gen-"
+
+
+class StringTable:
+    """
+    Read-only table of strings stored as one UTF-8 blob plus an int64 offset
+    array. Both files are plain .npy, so they memory-map without pickling.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        mode = "r" if mmap else None
+        return cls(np.load(f"{prefix}.data.npy", mmap_mode=mode),
+                   np.load(f"{prefix}.offsets.npy", mmap_mode=mode))
+
+    @staticmethod
+    def write(prefix, strings):
+        encoded = [str(s).encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        np.save(f"{prefix}.data.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(f"{prefix}.offsets.npy", offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def tolist(self):
+        return list(self)
+
+
+class AnswerView:
+    """Per-question view over the unique answer table: view[i] is the answer of question i."""
+
+    def __init__(self, unique, answer_ids):
+        self.unique = unique
+        self.answer_ids = answer_ids
+
+    def __len__(self):
+        return len(self.answer_ids)
+
+    def __getitem__(self, i):
+        return self.unique[self.answer_ids[int(i)]]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def tolist(self):
+        return list(self)
+
+
+def dedupe(strings):
+    """Returns (unique strings in first-seen order, int32 id of each input string)."""
+    ids = {}
+    answer_ids = np.fromiter((ids.setdefault(str(s), len(ids)) for s in strings),
+                             dtype=np.int32, count=len(strings))
+    return list(ids), answer_ids
+
+
+class Bundle:
+    """
+    A versioned artifact directory produced by EmbeddingStore.build_index:
+
+        manifest.json          format version, counts, dimension, model
+        embeddings.npy         float32 (n, dim)
+        questions.*.npy        StringTable
+        answers.*.npy          StringTable of unique answers
+        answer_ids.npy         int32 (n,) answer of each question
+        neighbors.npy          int32 (n, k + 1) recommendation neighbours
+        hashes.npy             per-question content hashes, for incremental builds
+        faiss.index            flat / IVF / HNSW / IVF-PQ, opened with mmap
+
+    Everything is memory-mapped, so worker processes share one page-cached copy.
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mmap = mmap
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") not in SUPPORTED_VERSIONS:
+            raise ValueError(
+                f"Unsupported bundle format {self.manifest.get('format_version')} in {path} "
+                f"(expected one of {SUPPORTED_VERSIONS}); rebuild it with embedding.py"
+            )
+        mode = "r" if mmap else None
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode=mode)
+        self.questions = StringTable.load(os.path.join(path, "questions"), mmap)
+        self.unique_answers = StringTable.load(os.path.join(path, "answers"), mmap)
+        if self.manifest["format_version"] >= 2:
+            self.answer_ids = np.load(os.path.join(path, "answer_ids.npy"), mmap_mode=mode)
+        else:
+            self.answer_ids = np.arange(len(self.unique_answers), dtype=np.int32)
+        self.answers = AnswerView(self.unique_answers, self.answer_ids)
+        neighbors_file = os.path.join(path, "neighbors.npy")
+        self.neighbors = np.load(neighbors_file, mmap_mode=mode) if os.path.exists(neighbors_file) else None
+        hashes_file = os.path.join(path, "hashes.npy")
+        self.hashes = np.load(hashes_file) if os.path.exists(hashes_file) else None
+        self._index = None
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    @property
+    def generation(self):
+        # Directory name for bundles written by write_generation(), e.g. "gen-000003"
+        return self.manifest.get("generation", os.path.basename(os.path.normpath(self.path)))
+
+    @property
+    def metric(self):
+        return self.manifest.get("metric", "l2")
+
+    @property
+    def index(self):
+        # Opened on first use: the recommender never needs it
+        if self._index is None:
+            index = read_index(os.path.join(self.path, "faiss.index"), self.mmap)
+            self._index = configure_index(index, self.manifest.get("index_params", {}))
+        return self._index
+
+    def search(self, queries, k):
+        """
+        Searches the index, whatever its type. Returns (distances, indices) with
+        distances as squared L2, so callers score every metric the same way.
+        """
+        distances, indices = self.index.search(prepare_vectors(queries, self.metric), k)
+        return to_l2_distances(distances, self.metric), indices
+
+
+def read_index(index_file, mmap=True):
+    if mmap:
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        try:
+            return faiss.read_index(index_file, flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass  # index type without mmap support
+    return faiss.read_index(index_file)
+
+
+def load_bundle(path="data/bundle", mmap=True):
+    """Loads a bundle directory, or the current generation if path is a generation root."""
+    return Bundle(resolve_bundle(path), mmap=mmap)
+
+
+def list_generations(root):
+    """Complete generation directories under root, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root)
+                  if d.startswith(GENERATION_PREFIX) and os.path.exists(os.path.join(root, d, MANIFEST)))
+
+
+def current_generation(root):
+    """Name of the generation root/CURRENT points at, or None for a plain bundle directory."""
+    try:
+        with open(os.path.join(root, CURRENT), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_bundle(root):
+    generation = current_generation(root)
+    return os.path.join(root, generation) if generation else root
+
+
+def set_current(root, generation):
+    """Points CURRENT at generation with an atomic rename, so readers never see a torn pointer."""
+    if not os.path.exists(os.path.join(root, generation, MANIFEST)):
+        raise ValueError(f"No generation {generation} in {root}")
+    tmp = os.path.join(root, f"{CURRENT}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(generation + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(root, CURRENT))
+
+
+def write_generation(root, embeddings, questions, answers, index, neighbors=None, hashes=None, keep=3,
+                     **metadata):
+    """
+    Writes a bundle as the next generation under root and points CURRENT at
+    it. Processes serving an older generation keep their memory-mapped copy
+    until they reload; the newest keep generations stay on disk for
+    rollback_generation(), and so do the generation CURRENT named before
+    this write (the one servers still run and roll back to) and the one
+    rollback_generation() would now return. Returns the generation path.
+    """
+    os.makedirs(root, exist_ok=True)
+    existing = list_generations(root)
+    live = current_generation(root)
+    number = int(existing[-1][len(GENERATION_PREFIX):]) + 1 if existing else 1
+    generation = f"{GENERATION_PREFIX}{number:06d}"
+    path = write_bundle(os.path.join(root, generation), embeddings, questions, answers, index, neighbors, hashes,
+                        generation=generation, **metadata)
+    set_current(root, generation)
+
+    protected = {generation, live, existing[-1] if existing else None}
+    for old in list_generations(root)[:-keep]:
+        if old not in protected:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return path
+
+
+def rollback_generation(root):
+    """Points CURRENT at the generation before the current one. Returns its name."""
+    generations = list_generations(root)
+    current = current_generation(root)
+    if current not in generations or generations.index(current) == 0:
+        raise ValueError(f"No generation before {current} in {root}")
+    previous = generations[generations.index(current) - 1]
+    set_current(root, previous)
+    return previous
+
+
+def content_hash(text):
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+def write_bundle(path, embeddings, questions, answers, index, neighbors=None, hashes=None, **metadata):
+    """
+    Writes a bundle to path. Files go to a temporary sibling directory that is
+    renamed into place at the end, so readers never see a half-written bundle.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if not len(questions) == len(answers) == len(embeddings):
+        raise ValueError("questions, answers and embeddings must have the same length")
+
+    tmp = f"{path.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "embeddings.npy"), embeddings)
+    StringTable.write(os.path.join(tmp, "questions"), questions)
+    unique_answers, answer_ids = dedupe(answers)
+    StringTable.write(os.path.join(tmp, "answers"), unique_answers)
+    np.save(os.path.join(tmp, "answer_ids.npy"), answer_ids)
+    if neighbors is not None:
+        np.save(os.path.join(tmp, "neighbors.npy"), np.asarray(neighbors, dtype=np.int32))
+    if hashes is not None:
+        np.save(os.path.join(tmp, "hashes.npy"), np.asarray(hashes, dtype="S40"))
+    faiss.write_index(index, os.path.join(tmp, "faiss.index"))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "count": len(embeddings),
+        "unique_answers": len(unique_answers),
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        **metadata,
+    }
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(path):
+        old = f"{path.rstrip(os.sep)}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(path, old)
+        os.rename(tmp, path)
+        shutil.rmtree(old)
+    else:
+        os.rename(tmp, path)
+    return path
+
+
+def build_neighbors(index, embeddings, num_neighbors=10):
+    """
+    k-nearest-neighbour table for every indexed vector, as an int32 array of
+    shape (n, num_neighbors + 1). Row i usually starts with i itself; -1 pads
+    rows when the index holds fewer vectors than requested.
+    """
+    _, indices = index.search(np.asarray(embeddings, dtype=np.float32), num_neighbors + 1)
+    return indices.astype(np.int32)
+
+
+def convert_legacy(data_dir="data", bundle_dir="data/bundle", num_neighbors=10):
+    """
+    Builds a bundle from the old faiss.index / questions.npy / answers.npy
+    files, written as a new generation under bundle_dir (existing generations
+    stay available for rollback_generation()).
+    """
+    index = faiss.read_index(os.path.join(data_dir, "faiss.index"))
+    embeddings = index.reconstruct_n(0, index.ntotal)
+    questions = np.load(os.path.join(data_dir, "questions.npy"), allow_pickle=True)
+    answers = np.load(os.path.join(data_dir, "answers.npy"), allow_pickle=True)
+    neighbors = build_neighbors(index, embeddings, num_neighbors)
+    hashes = [content_hash(q) for q in questions]
+    return write_generation(bundle_dir, embeddings, questions, answers, index, neighbors, hashes,
+                            model_name="all-MiniLM-L6-v2", encoder_backend="torch",
+                            index_type="flat", metric="l2", index_params={})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert legacy artifacts or manage bundle generations.")
+    parser.add_argument("--root", default="data/bundle")
+    parser.add_argument("--list", action="store_true", help="list generations and the current one")
+    parser.add_argument("--rollback", action="store_true", help="point CURRENT at the previous generation")
+    parser.add_argument("--use", metavar="GENERATION", help="point CURRENT at this generation")
+    parser.add_argument("--convert-legacy", metavar="DATA_DIR",
+                        help="write the legacy faiss.index/questions.npy/answers.npy in DATA_DIR as a new generation")
+    args = parser.parse_args()
+
+    if args.list:
+        current = current_generation(args.root)
+        for generation in list_generations(args.root):
+            print(f"{'*' if generation == current else ' '} {generation}")
+    elif args.rollback:
+        print(f"CURRENT → {rollback_generation(args.root)}")
+    elif args.use:
+        set_current(args.root, args.use)
+        print(f"CURRENT → {args.use}")
+    elif args.convert_legacy:
+        print(f"Bundle written → {convert_legacy(args.convert_legacy, args.root)}")
+    else:
+        parser.print_help()
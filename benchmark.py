@@ -0,0 +1,161 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+SUBJECTS = ["farm", "crop", "field", "report", "subscription", "account", "satellite image", "soil test",
+            "irrigation plan", "weather alert", "pest warning", "yield estimate", "boundary", "payment"]
+ACTIONS = ["add", "delete", "share", "download", "update", "view", "renew", "check", "export", "edit"]
+TEMPLATES = [
+    "How do I {action} my {subject}?",
+    "Can I {action} the {subject} from the app?",
+    "Where can I {action} my {subject}?",
+    "Is it possible to {action} a {subject} on the web portal?",
+    "What happens when I {action} my {subject}?",
+]
+
+
+def make_corpus(size, paraphrases=4):
+    """
+    Synthetic FAQ in the train_data.json shape: groups of `paraphrases`
+    distinct questions share one answer, like the expanded dataset.
+    """
+    corpus = []
+    for i in range(size):
+        group = i // paraphrases
+        action, subject = ACTIONS[group % len(ACTIONS)], SUBJECTS[(group // len(ACTIONS)) % len(SUBJECTS)]
+        question = TEMPLATES[(i + group) % len(TEMPLATES)].format(action=action, subject=subject)
+        corpus.append({
+            "instruction": f"{question} (ref {group})",
+            "response": f"To {action} your {subject}, open the app and follow the steps in section {group}.",
+        })
+    return corpus
+
+
+def latency_stats(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "qps": float(len(ms) / (ms.sum() / 1000)) if ms.sum() else 0.0,
+    }
+
+
+def timed_calls(fn, args):
+    times = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return None
+
+
+def run_size(size, num_queries=200, encoder_backend=None, index_type="flat", metric="l2"):
+    """Benchmarks one corpus size; meant to run in a fresh process so memory figures are per-size."""
+    from embedding import EmbeddingStore
+    from model import ChatBot
+    from rank import HybridChatBot
+    from recommender import QuestionRecommender
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = make_corpus(size)
+        json_path = os.path.join(tmp, "train_data.json")
+        bundle_dir = os.path.join(tmp, "bundle")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(corpus, f)
+
+        store = EmbeddingStore(json_path=json_path, encoder_backend=encoder_backend)
+        start = time.perf_counter()
+        store.build_index(bundle_dir=bundle_dir, incremental=False, index_type=index_type, metric=metric)
+        build_seconds = time.perf_counter() - start
+        del store
+
+        rng = random.Random(1)
+        sample = [corpus[rng.randrange(size)]["instruction"] for _ in range(num_queries)]
+        # Unique, slightly edited queries, so neither the embedding cache nor exact matches help
+        queries = [f"{q.split(' (ref')[0]} please {i}" for i, q in enumerate(sample)]
+
+        # cache_size=0: measure the encoder on every call
+        hybrid = HybridChatBot(bundle_dir=bundle_dir, cache_size=0, encoder_backend=encoder_backend)
+        hybrid.search(queries[0])  # warm-up
+        hybrid_times = timed_calls(lambda q: hybrid.search(q, top_k=5, alpha=0.8), queries)
+        start = time.perf_counter()
+        hybrid.search_many(queries, top_k=5, alpha=0.8)
+        batch_qps = len(queries) / (time.perf_counter() - start)
+        del hybrid
+
+        chatbot = ChatBot(bundle_dir=bundle_dir, cache_size=0, encoder_backend=encoder_backend)
+        chatbot.search(queries[0])
+        chatbot_times = timed_calls(chatbot.search, queries)
+        del chatbot
+
+        recommender = QuestionRecommender(bundle_dir=bundle_dir)
+        recommend_times = timed_calls(recommender.recommend, sample)
+
+        return {
+            "size": size,
+            "index_type": index_type,
+            "metric": metric,
+            "build_seconds": build_seconds,
+            "hybrid_search": latency_stats(hybrid_times),
+            "hybrid_search_many_qps": batch_qps,
+            "chatbot_search": latency_stats(chatbot_times),
+            "recommend": latency_stats(recommend_times),
+            "rss_mb": rss_mb(),
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmark for build, search and recommend.")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000",
+                        help="comma-separated corpus sizes")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--encoder", default=None, help="encoder backend (default: CHATBOT_ENCODER or torch)")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--metric", default="l2")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = []
+    # One fresh process per size keeps peak RSS and warm caches from leaking between sizes
+    ctx = multiprocessing.get_context("spawn")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with ctx.Pool(1) as pool:
+            row = pool.apply(run_size, (size, args.queries, args.encoder, args.index_type, args.metric))
+        results.append(row)
+        print(f"{size:>8}: build {row['build_seconds']:.1f}s, "
+              f"hybrid p50 {row['hybrid_search']['p50_ms']:.2f}ms p99 {row['hybrid_search']['p99_ms']:.2f}ms, "
+              f"recommend p50 {row['recommend']['p50_ms']:.3f}ms, peak RSS {row['peak_rss_mb']:.0f}MB")
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "encoder_backend": args.encoder or os.environ.get("CHATBOT_ENCODER", "torch"),
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved → {args.out}")
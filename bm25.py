@@ -0,0 +1,91 @@
+from collections import Counter
+import numpy as np
+
+
+def tokenize(text):
+    return text.lower().split()
+
+
+class SparseBM25:
+    """
+    Okapi BM25 over a precomputed inverted index.
+
+    Every (term, document) weight is computed once at construction, so a query
+    only touches the postings of its own terms instead of the whole corpus.
+    Scores match rank_bm25.BM25Okapi for the same k1, b and epsilon.
+    """
+
+    def __init__(self, tokenized_corpus, k1=1.5, b=0.75, epsilon=0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.corpus_size = len(tokenized_corpus)
+        self.vocab = {}
+
+        term_ids, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(self.corpus_size, dtype=np.float64)
+        for doc_id, tokens in enumerate(tokenized_corpus):
+            doc_len[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float64)
+
+        # --- Postings, grouped by term (CSR layout) ---
+        order = np.argsort(term_ids, kind="stable")
+        term_ids, self.doc_ids, tfs = term_ids[order], doc_ids[order], tfs[order]
+        doc_freq = np.bincount(term_ids, minlength=len(self.vocab))
+        self.indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=self.indptr[1:])
+
+        # --- IDF, with the same negative-idf floor as BM25Okapi ---
+        idf = np.log(self.corpus_size - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+        average_idf = idf.mean() if len(idf) else 0.0
+        idf[idf < 0] = self.epsilon * average_idf
+        self.idf = idf
+
+        # --- Per-posting weights ---
+        avgdl = doc_len.sum() / self.corpus_size if self.corpus_size else 0.0
+        norm = k1 * (1 - b + b * doc_len[self.doc_ids] / avgdl) if avgdl else k1
+        self.weights = idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)
+
+    def _postings(self, query_tokens):
+        ids, weights = [], []
+        for term in query_tokens:
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            ids.append(self.doc_ids[start:end])
+            weights.append(self.weights[start:end])
+        if not ids:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        return np.concatenate(ids), np.concatenate(weights)
+
+    def get_scores(self, query_tokens):
+        """Dense score vector over the whole corpus (BM25Okapi-compatible)."""
+        ids, weights = self._postings(query_tokens)
+        return np.bincount(ids, weights=weights, minlength=self.corpus_size)
+
+    def top_k(self, query_tokens, k):
+        """
+        Returns (doc_ids, scores) of the k best matching documents, best first.
+        Only documents containing at least one query term are returned.
+        """
+        ids, weights = self._postings(query_tokens)
+        if k <= 0 or not len(ids):
+            return ids[:0], weights[:0]
+        candidates, inverse = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if len(candidates) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return candidates[order], scores[order]
+
+    def top_k_many(self, queries_tokens, k):
+        return [self.top_k(tokens, k) for tokens in queries_tokens]
@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+import metrics
+
+
+def normalize(text):
+    """Cache key for a query: case- and whitespace-insensitive (the encoder is uncased)."""
+    return " ".join(str(text).lower().split())
+
+
+class EmbeddingCache:
+    """
+    Query-embedding cache: a bounded in-memory LRU in front of an optional
+    SQLite tier that survives restarts. Keys are normalized query text,
+    namespaced by model name so a model change never serves stale vectors.
+    """
+
+    def __init__(self, max_size=4096, path=None, namespace=""):
+        self.max_size = max_size
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "namespace TEXT, key TEXT, vector BLOB, PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._lru)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._lru)}
+
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def get(self, text):
+        key = normalize(text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+            if vector is None:
+                self.misses += 1
+                metrics.inc("embedding_cache_misses_total")
+            else:
+                self.hits += 1
+                metrics.inc("embedding_cache_hits_total")
+            return vector
+
+    def put_many(self, texts, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        keys = [normalize(t) for t in texts]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                    [(self.namespace, key, vector.tobytes()) for key, vector in zip(keys, vectors)],
+                )
+                self._db.commit()
+
+    def encode(self, encode_fn, texts):
+        """
+        Returns a float32 matrix of embeddings for texts. Only cache misses are
+        passed to encode_fn, in a single batch; repeated texts are encoded once.
+        """
+        texts = list(texts)
+        found = [self.get(t) for t in texts]
+        missing = list(dict.fromkeys(normalize(t) for t, v in zip(texts, found) if v is None))
+        if missing:
+            originals = {}
+            for t, v in zip(texts, found):
+                if v is None:
+                    originals.setdefault(normalize(t), t)
+            encoded = encode_fn([originals[key] for key in missing])
+            self.put_many(missing, encoded)
+            fresh = dict(zip(missing, np.asarray(encoded, dtype=np.float32)))
+            found = [v if v is not None else fresh[normalize(t)] for t, v in zip(texts, found)]
+        return np.vstack(found).astype(np.float32, copy=False)
@@ -1,26 +1,115 @@
+import argparse
 import json
+import os
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
+from artifacts import build_neighbors, content_hash, load_bundle, resolve_bundle, write_generation
+from encoders import load_encoder
+from indexes import INDEX_TYPES, METRICS, index_report, make_index, prepare_vectors
+from translation import Translator, build_catalog
 
 class EmbeddingStore:
-    def __init__(self, model_name="all-MiniLM-L6-v2", json_path="data/train_data.json"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name="all-MiniLM-L6-v2", json_path="data/train_data.json", encoder_backend=None):
+        self.model_name = model_name
+        self.model = load_encoder(model_name, encoder_backend)
         with open(json_path, "r", encoding="utf-8") as f:
             self.qa_data = json.load(f)
         self.questions = [item["instruction"] for item in self.qa_data]
         self.answers = [item["response"] for item in self.qa_data]
 
-    def build_index(self, index_file="data/faiss.index"):
-        embeddings = self.model.encode(self.questions, convert_to_numpy=True)
-        dim = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dim)
-        index.add(embeddings)
-        faiss.write_index(index, index_file)
-        np.save("data/questions.npy", self.questions)
-        np.save("data/answers.npy", self.answers)
-        print(f"FAISS index built and saved → {index_file}")
+    def build_index(self, bundle_dir="data/bundle", num_neighbors=24, incremental=True, processes=None,
+                    index_type="flat", metric="l2", report=False):
+        """
+        Builds the artifact bundle. With incremental=True, questions whose
+        content hash is already in the existing bundle (built with the same
+        encoder) reuse their stored embedding; only new or edited questions are
+        encoded, and deleted ones simply drop out.
+
+        index_type is one of flat, ivf, hnsw, ivfpq; metric "ip" builds an
+        inner-product (cosine) index over normalized vectors. With report=True
+        every type is compared against the flat baseline (recall@k, latency)
+        and the results are saved to index_report.json in the bundle.
+        num_neighbors=24 covers respond()'s default recommendation depth.
+
+        Each build is written as a new generation under bundle_dir and made
+        current; running servers pick it up with HybridChatBot.reload()/watch().
+        """
+        hashes = [content_hash(q) for q in self.questions]
+        previous = self._previous_embeddings(bundle_dir) if incremental else {}
+
+        to_encode = list(dict.fromkeys(h for h in hashes if h not in previous))
+        if to_encode:
+            text_for = dict(zip(hashes, self.questions))
+            fresh = self.model.encode([text_for[h] for h in to_encode], processes=processes)
+            previous.update(zip(to_encode, fresh))
+        embeddings = np.vstack([previous[h] for h in hashes]).astype(np.float32)
+        print(f"Encoded {len(to_encode)} new/changed questions, reused {len(hashes) - len(to_encode)}")
+
+        index, index_params = make_index(embeddings, index_type, metric)
+
+        # Precompute recommendation neighbours for every question in one batch search of the new index:
+        # exact for flat, and for ivf/hnsw/ivfpq as approximate (and as fast) as serving, not an O(n²) scan
+        neighbors = build_neighbors(index, prepare_vectors(embeddings, metric), num_neighbors)
+
+        path = write_generation(bundle_dir, embeddings, self.questions, self.answers, index, neighbors, hashes,
+                                model_name=self.model_name, encoder_backend=self.model.backend,
+                                index_type=index_type, metric=metric, index_params=index_params)
+        print(f"FAISS {index_type} ({metric}) index and artifact bundle saved → {path}")
+
+        if report:
+            rows = index_report(embeddings)
+            with open(os.path.join(path, "index_report.json"), "w", encoding="utf-8") as f:
+                json.dump(rows, f, indent=2)
+            for row in rows:
+                print(f"{row['index_type']:>6} {row['metric']}: recall@{row['k']} {row['recall_at_k']:.3f}, "
+                      f"{row['latency_ms']:.3f} ms/query")
+
+    def build_catalog(self, bundle_dir="data/bundle", translator=None, languages=None):
+        """
+        Pre-translates the bundle's questions, answers and UI strings for every
+        language (see translation.build_catalog). Run it after build_index:
+        the catalog belongs to the current generation, and a new build starts
+        a new generation without one.
+        translator defaults to a disk-cached Google Translator, so only new or
+        edited strings hit the network.
+        """
+        translator = translator or Translator(cache_path="data/translations.sqlite")
+        path = build_catalog(load_bundle(bundle_dir), translator, languages)
+        print(f"Translation catalog saved → {path}")
+
+    def _previous_embeddings(self, bundle_dir):
+        """content hash → embedding from the current bundle, if it was built with the same encoder."""
+        if not os.path.exists(os.path.join(resolve_bundle(bundle_dir), "manifest.json")):
+            return {}
+        try:
+            bundle = load_bundle(bundle_dir)
+        except ValueError as e:
+            print(f"⚠️ Ignoring existing bundle: {e}")
+            return {}
+        manifest = bundle.manifest
+        if (manifest.get("model_name") != self.model_name
+                or manifest.get("encoder_backend", "torch") != self.model.backend):
+            return {}
+        if bundle.hashes is not None:
+            hashes = [h.decode("ascii") for h in bundle.hashes]
+        else:
+            hashes = [content_hash(q) for q in bundle.questions]
+        return {h: np.array(bundle.embeddings[i]) for i, h in enumerate(hashes)}
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the FAISS index and artifact bundle.")
+    parser.add_argument("--full", action="store_true", help="re-encode every question")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="encoder processes for large builds")
+    parser.add_argument("--index-type", default="flat", choices=INDEX_TYPES)
+    parser.add_argument("--metric", default="l2", choices=METRICS, help="ip = cosine on normalized vectors")
+    parser.add_argument("--report", action="store_true", help="compare recall@k and latency of every index type")
+    parser.add_argument("--translate", nargs="?", const="", metavar="LANGS",
+                        help="also pre-translate the catalog (comma-separated codes, default: all languages)")
+    args = parser.parse_args()
+
     store = EmbeddingStore()
-    store.build_index()
+    store.build_index(incremental=not args.full, processes=args.processes,
+                      index_type=args.index_type, metric=args.metric, report=args.report)
+    if args.translate is not None:
+        store.build_catalog(languages=args.translate.split(",") if args.translate else None)
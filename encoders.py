@@ -0,0 +1,119 @@
+import argparse
+import os
+import time
+import numpy as np
+
+# Backend used when none is passed explicitly; set per deployment
+DEFAULT_BACKEND = os.environ.get("CHATBOT_ENCODER", "torch")
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# Quantized ONNX export shipped in the all-MiniLM-L6-v2 hub repo (AVX2 runs on any recent x86 CPU)
+DEFAULT_ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+# Batches at least this large are encoded in a multi-process pool when processes > 1
+MULTI_PROCESS_MIN_TEXTS = 10000
+
+# Minimum mean top-k overlap with the full-precision index for a backend to be usable
+AGREEMENT_THRESHOLD = 0.9
+
+
+class Encoder:
+    """
+    Query/document encoder with a selectable runtime:
+
+        torch        full-precision PyTorch SentenceTransformer (the original)
+        torch-int8   PyTorch with dynamically int8-quantized Linear layers
+        onnx         ONNX Runtime, fp32
+        onnx-int8    ONNX Runtime with the int8-quantized export
+
+    encode() always returns a float32 numpy matrix. The ONNX backends need
+    the optional extra: pip install "sentence-transformers[onnx]".
+    """
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", backend=None, onnx_file=None):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.backend = backend or DEFAULT_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown encoder backend {self.backend!r}; choose one of {', '.join(BACKENDS)}")
+
+        # Plain torch keeps SentenceTransformer's device choice (CUDA/MPS when present);
+        # dynamic int8 quantization and the ONNX exports here run on CPU only
+        if self.backend == "torch":
+            self.model = SentenceTransformer(model_name)
+        elif self.backend == "torch-int8":
+            import torch
+            model = SentenceTransformer(model_name, device="cpu")
+            self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif self.backend == "onnx":
+            self.model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        else:
+            self.model = SentenceTransformer(
+                model_name, device="cpu", backend="onnx",
+                model_kwargs={"file_name": onnx_file or DEFAULT_ONNX_INT8_FILE},
+            )
+
+    @property
+    def name(self):
+        return f"{self.model_name}:{self.backend}"
+
+    def encode(self, texts, batch_size=32, processes=None):
+        """
+        Encodes texts. With processes > 1, large batches on the PyTorch backends
+        are split over a SentenceTransformer multi-process pool.
+        """
+        texts = list(texts)
+        if processes and processes > 1 and len(texts) >= MULTI_PROCESS_MIN_TEXTS and self.backend.startswith("torch"):
+            pool = self.model.start_multi_process_pool(["cpu"] * processes)
+            try:
+                embeddings = self.model.encode_multi_process(texts, pool, batch_size=batch_size)
+            finally:
+                self.model.stop_multi_process_pool(pool)
+        else:
+            embeddings = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+def load_encoder(model_name="all-MiniLM-L6-v2", backend=None):
+    return Encoder(model_name, backend)
+
+
+def check_agreement(encoder, bundle, k=5, sample=None):
+    """
+    Re-encodes the stored questions (all of them, or `sample` evenly spaced
+    ones) with encoder and searches the bundle's index. Returns (mean top-k
+    overlap, encode seconds per text), where the reference top-k comes from
+    the stored full-precision embeddings.
+    """
+    ids = np.arange(len(bundle))
+    if sample and sample < len(ids):
+        ids = np.linspace(0, len(ids) - 1, sample).astype(np.int64)
+    questions = [bundle.questions[i] for i in ids]
+    _, reference = bundle.search(np.asarray(bundle.embeddings[ids]), k)
+
+    start = time.perf_counter()
+    embeddings = encoder.encode(questions)
+    per_text = (time.perf_counter() - start) / max(len(questions), 1)
+
+    _, candidate = bundle.search(embeddings, k)
+    overlap = [len(set(r) & set(c)) / k for r, c in zip(reference, candidate)]
+    return float(np.mean(overlap)), per_text
+
+
+if __name__ == "__main__":
+    from artifacts import load_bundle
+
+    parser = argparse.ArgumentParser(description="Check an encoder backend against the built index.")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=BACKENDS)
+    parser.add_argument("--bundle", default="data/bundle")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=AGREEMENT_THRESHOLD)
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.bundle)
+    encoder = load_encoder(bundle.manifest.get("model_name", "all-MiniLM-L6-v2"), args.backend)
+    agreement, per_text = check_agreement(encoder, bundle, args.k)
+    print(f"{encoder.name}: top-{args.k} agreement {agreement:.3f} "
+          f"(threshold {args.threshold}), {per_text * 1000:.2f} ms/text")
+    raise SystemExit(0 if agreement >= args.threshold else 1)
@@ -0,0 +1,275 @@
+import argparse
+import json
+import time
+import numpy as np
+from artifacts import load_bundle
+from bm25 import SparseBM25, tokenize
+from cache import normalize
+from indexes import prepare_vectors
+from rank import question_key
+
+FUSIONS = ("linear", "minmax", "rrf")
+ALPHAS = tuple(round(a, 2) for a in np.linspace(0.0, 1.0, 11))
+# Each fusion has its own score scale, so each gets its own threshold grid
+THRESHOLDS = {
+    "linear": (0.0, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0),
+    "minmax": (0.0, 0.1, 0.25, 0.5, 0.75),
+    "rrf": (0.0, 0.005, 0.01, 0.0125, 0.015),
+}
+RRF_K = 60
+# What the front ends run today: HybridChatBot(fallback_threshold=0.05), search(alpha=0.8)
+CURRENT_SETTING = ("linear", 0.8, 0.05)
+
+
+def load_queries(bundle, path="data/qa_pairs_expanded.json", all_stored=False):
+    """
+    Labelled queries: (text, answer id, stored row or -1). Each query comes
+    from a paraphrase variant whose answer is in the bundle. A variant that is
+    itself a stored question is held out: its own rows are hidden from the
+    search, so it has to be answered through one of its paraphrases.
+    With all_stored=True every stored question is used this way instead.
+    """
+    rows_by_key = {}
+    for i, q in enumerate(bundle.questions):
+        rows_by_key.setdefault(question_key(q), i)
+
+    if all_stored:
+        records = [(str(q), int(bundle.answer_ids[i])) for i, q in enumerate(bundle.questions)]
+    else:
+        answer_ids = {normalize(a): i for i, a in enumerate(bundle.unique_answers)}
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        records = [(item["question"], answer_ids.get(normalize(item["answer"]))) for item in data]
+        skipped = sum(answer is None for _, answer in records)
+        if skipped:
+            print(f"Skipping {skipped} variants whose answer is not in the bundle")
+        records = [(q, a) for q, a in records if a is not None]
+
+    # One query per distinct question text
+    queries = {}
+    for text, answer in records:
+        key = question_key(text)
+        if key not in queries:
+            queries[key] = (text, answer, rows_by_key.get(key, -1))
+    return list(queries.values())
+
+
+def score_matrices(bundle, queries, encoder=None):
+    """
+    Dense (queries x questions) embedding distances and BM25 scores, each
+    computed once for the whole query set. Stored questions reuse their
+    stored embedding; only unseen variants are encoded. Distances are exact
+    squared L2, as the flat index returns them.
+    """
+    texts = [text for text, _, _ in queries]
+    stored = np.array([row for _, _, row in queries])
+    embeddings = np.empty((len(queries), bundle.embeddings.shape[1]), dtype=np.float32)
+    embeddings[stored >= 0] = bundle.embeddings[stored[stored >= 0]]
+    unseen = np.flatnonzero(stored < 0)
+    if len(unseen):
+        if encoder is None:
+            from encoders import load_encoder
+            encoder = load_encoder(bundle.manifest.get("model_name", "all-MiniLM-L6-v2"),
+                                   bundle.manifest.get("encoder_backend"))
+        embeddings[unseen] = encoder.encode([texts[i] for i in unseen])
+
+    metric = bundle.metric
+    q = prepare_vectors(embeddings, metric)
+    x = prepare_vectors(bundle.embeddings, metric)
+    distances = (q ** 2).sum(1)[:, None] + (x ** 2).sum(1)[None, :] - 2.0 * q @ x.T
+    np.maximum(distances, 0.0, out=distances)
+
+    bm25 = SparseBM25([tokenize(str(question)) for question in bundle.questions])
+    bm25_scores = np.vstack([bm25.get_scores(tokenize(text)) for text in texts])
+    return distances, bm25_scores
+
+
+def hide_held_out(bundle, queries, distances, bm25_scores):
+    """Removes each held-out query's own question text from its candidates."""
+    keys = np.array([question_key(q) for q in bundle.questions], dtype=object)
+    for row, (text, _, stored) in enumerate(queries):
+        if stored >= 0:
+            own = keys == question_key(text)
+            distances[row, own] = np.inf
+            bm25_scores[row, own] = -np.inf
+
+
+def candidate_ranks(scores, depth, positive_only=False):
+    """
+    1-based rank of every column within its row's top-depth list, 0 outside
+    it, like the candidate lists HybridChatBot fuses (higher score = better).
+    positive_only drops zero scores, as SparseBM25.top_k skips documents
+    that share no query term.
+    """
+    depth = min(depth, scores.shape[1])
+    top = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    ranks = np.zeros(scores.shape, dtype=np.int32)
+    np.put_along_axis(ranks, top, np.arange(1, depth + 1, dtype=np.int32)[None, :], axis=1)
+    ranks[~np.isfinite(scores)] = 0
+    if positive_only:
+        ranks[scores <= 0] = 0
+    return ranks
+
+
+def _minmax(scores, mask):
+    low = np.where(mask, scores, np.inf).min(axis=1, keepdims=True)
+    high = np.where(mask, scores, -np.inf).max(axis=1, keepdims=True)
+    span = np.where(high > low, high - low, 1.0)
+    return np.where(mask, np.where(high > low, (scores - low) / span, 1.0), 0.0)
+
+
+def fuse(fusion, alpha, emb_scores, emb_ranks, bm25_scores, bm25_ranks):
+    """
+    Fused (queries x questions) scores; -inf marks questions in neither
+    candidate list. alpha weights BM25 against embeddings, as in HybridChatBot.
+      linear  alpha * bm25 + (1 - alpha) * 1/(1+dist)   (HybridChatBot._combine)
+      minmax  the same on per-query min-max normalized candidate scores
+      rrf     weighted reciprocal rank: alpha/(k + rank_bm25) + (1 - alpha)/(k + rank_emb)
+    """
+    emb_mask, bm25_mask = emb_ranks > 0, bm25_ranks > 0
+    if fusion == "linear":
+        fused = alpha * np.where(bm25_mask, bm25_scores, 0.0) + (1 - alpha) * np.where(emb_mask, emb_scores, 0.0)
+    elif fusion == "minmax":
+        fused = alpha * _minmax(bm25_scores, bm25_mask) + (1 - alpha) * _minmax(emb_scores, emb_mask)
+    elif fusion == "rrf":
+        fused = (alpha * np.where(bm25_mask, 1.0 / (RRF_K + bm25_ranks), 0.0)
+                 + (1 - alpha) * np.where(emb_mask, 1.0 / (RRF_K + emb_ranks), 0.0))
+    else:
+        raise ValueError(f"Unknown fusion {fusion!r}; choose one of {', '.join(FUSIONS)}")
+    return np.where(emb_mask | bm25_mask, fused, -np.inf)
+
+
+def collapse_answers(fused, answer_ids):
+    """(queries x answers) matrix: each answer scores as its best-scoring question."""
+    order = np.argsort(answer_ids, kind="stable")
+    sorted_ids = np.asarray(answer_ids)[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_ids)) + 1]
+    collapsed = np.full((fused.shape[0], int(sorted_ids[-1]) + 1), -np.inf)
+    collapsed[:, sorted_ids[starts]] = np.maximum.reduceat(fused[:, order], starts, axis=1)
+    return collapsed
+
+
+def answerable_queries(bundle, queries, distances):
+    """A held-out query is answerable only if some other question shares its answer."""
+    labels = np.array([answer for _, answer, _ in queries])
+    answer_ids = np.asarray(bundle.answer_ids)
+    return (np.isfinite(distances) & (answer_ids[None, :] == labels[:, None])).any(axis=1)
+
+
+def sweep(bundle, queries, distances, bm25_scores, fusions=FUSIONS, alphas=ALPHAS, thresholds=None,
+          top_k=5, collapse_depth=4):
+    """
+    Scores every (fusion, alpha, threshold) setting. The fusion and the
+    answer collapse run once per (fusion, alpha) on whole matrices; the
+    thresholds are then a single comparison each. Recall and MRR (cut at
+    top_k) are over queries that have an answer left to find; a fallback
+    counts as a miss.
+
+    As in HybridChatBot._combine, answers are ranked on the top_k candidates
+    of each retriever (the head); answers found only deeper (the tail, down
+    to top_k * collapse_depth) rank after them, and the fallback threshold
+    applies to the head's best score.
+    """
+    thresholds = thresholds or THRESHOLDS
+    depth = top_k * collapse_depth
+    emb_scores = 1.0 / (1.0 + distances)
+    emb_ranks = candidate_ranks(-distances, depth)
+    bm25_ranks = candidate_ranks(bm25_scores, depth, positive_only=True)
+    emb_head, bm25_head = np.where(emb_ranks <= top_k, emb_ranks, 0), np.where(bm25_ranks <= top_k, bm25_ranks, 0)
+    emb_tail, bm25_tail = emb_ranks - emb_head, bm25_ranks - bm25_head
+    in_head = (emb_head > 0) | (bm25_head > 0)
+
+    labels = np.array([answer for _, answer, _ in queries])
+    answer_ids = np.asarray(bundle.answer_ids)
+    answerable = answerable_queries(bundle, queries, distances)
+    if not answerable.any():
+        raise ValueError("No query has an answer left to find once held-out questions are hidden")
+
+    rows = []
+    for fusion in fusions:
+        for alpha in alphas:
+            head = collapse_answers(fuse(fusion, alpha, emb_scores, emb_head, bm25_scores, bm25_head), answer_ids)
+            tail = fuse(fusion, alpha, emb_scores, emb_tail, bm25_scores, bm25_tail)
+            tail[in_head] = -np.inf
+            tail = collapse_answers(tail, answer_ids)
+            tail[np.isfinite(head)] = -np.inf
+
+            head_true = head[np.arange(len(labels)), labels]
+            tail_true = tail[np.arange(len(labels)), labels]
+            rank = np.where(np.isfinite(head_true),
+                            1 + (head > head_true[:, None]).sum(axis=1),
+                            1 + np.isfinite(head).sum(axis=1) + (tail > tail_true[:, None]).sum(axis=1))
+            found = (np.isfinite(head_true) | np.isfinite(tail_true)) & (rank <= top_k)
+            best = head.max(axis=1)
+            best = np.where(np.isfinite(best), best, tail.max(axis=1))
+
+            grid = np.asarray(thresholds[fusion] if isinstance(thresholds, dict) else thresholds)
+            # (thresholds x queries): HybridChatBot falls back on no candidates or best < threshold
+            fallback = ~np.isfinite(best)[None, :] | (best[None, :] < grid[:, None])
+            hits = found[None, :] & ~fallback
+            for i, threshold in enumerate(grid):
+                row = {
+                    "fusion": fusion,
+                    "alpha": float(alpha),
+                    "threshold": float(threshold),
+                    "mrr": float(np.where(hits[i] & answerable, 1.0 / rank, 0.0)[answerable].mean()),
+                    "fallback_rate": float(fallback[i].mean()),
+                }
+                for k in sorted({1, 3, top_k}):
+                    row[f"recall@{k}"] = float((hits[i] & (rank <= k))[answerable].mean())
+                if not answerable.all():
+                    row["unanswerable_fallback"] = float(fallback[i][~answerable].mean())
+                rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep fusion method, alpha and fallback threshold.")
+    parser.add_argument("--bundle", default="data/bundle")
+    parser.add_argument("--queries", default="data/qa_pairs_expanded.json",
+                        help="JSON list of {question, answer} paraphrase variants")
+    parser.add_argument("--all-stored", action="store_true",
+                        help="hold out every stored question instead (leave-one-out over the bundle)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--fusions", default=",".join(FUSIONS))
+    parser.add_argument("--alphas", help="comma-separated alphas (default: 0.0 to 1.0 by 0.1)")
+    parser.add_argument("--thresholds", help="comma-separated thresholds for every fusion (default: per fusion)")
+    parser.add_argument("--out", default="eval_results.json")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    bundle = load_bundle(args.bundle)
+    queries = load_queries(bundle, args.queries, args.all_stored)
+    distances, bm25_scores = score_matrices(bundle, queries)
+    hide_held_out(bundle, queries, distances, bm25_scores)
+    scored = time.perf_counter()
+
+    alphas = [float(a) for a in args.alphas.split(",")] if args.alphas else ALPHAS
+    thresholds = [float(t) for t in args.thresholds.split(",")] if args.thresholds else None
+    rows = sweep(bundle, queries, distances, bm25_scores, args.fusions.split(","), alphas, thresholds, args.top_k)
+    done = time.perf_counter()
+    answerable = int(answerable_queries(bundle, queries, distances).sum())
+    print(f"{len(queries)} queries ({answerable} answerable) x {len(bundle)} questions: "
+          f"scored in {scored - start:.2f}s, {len(rows)} settings swept in {done - scored:.2f}s")
+
+    recall = f"recall@{args.top_k}"
+
+    def show(label, row):
+        print(f"{label:<22} {row['fusion']:>6} alpha={row['alpha']:.2f} threshold={row['threshold']:<7g} "
+              f"recall@1 {row['recall@1']:.3f}  {recall} {row[recall]:.3f}  MRR {row['mrr']:.3f}  "
+              f"fallback {row['fallback_rate']:.3f}")
+
+    fusion, alpha, threshold = CURRENT_SETTING
+    current = [r for r in rows if (r["fusion"], r["alpha"], r["threshold"]) == (fusion, alpha, threshold)]
+    if current:
+        show("current (alpha 0.8)", current[0])
+    for fusion in args.fusions.split(","):
+        best = max((r for r in rows if r["fusion"] == fusion), key=lambda r: (r["mrr"], -r["fallback_rate"]))
+        show(f"best {fusion}", best)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"queries": len(queries), "answerable": answerable, "questions": len(bundle),
+                   "top_k": args.top_k, "results": rows}, f, indent=2)
+    print(f"Results saved → {args.out}")
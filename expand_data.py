@@ -1,15 +1,14 @@
+import argparse
+import hashlib
 import json
-import random
-from transformers import pipeline
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
 
-# --- 1. Load base Q&A dataset ---
-with open("data/qa_pairs.json", "r", encoding="utf-8") as f:
-    qa_data = json.load(f)
+PARAPHRASE_MODEL = "Vamsi/T5_Paraphrase_Paws"
 
-# --- 2. Initialize paraphraser ---
-paraphraser = pipeline("text2text-generation", model="Vamsi/T5_Paraphrase_Paws")
-
-# --- 3. Define synonyms for domain-specific words ---
+# --- 1. Define synonyms for domain-specific words ---
 synonyms = {
     "see": ["view", "check", "look at"],
     "access": ["open", "retrieve", "get"],
@@ -17,6 +16,18 @@ synonyms = {
     "crop": ["farming", "agriculture"]
 }
 
+_paraphraser = None
+
+
+def load_paraphraser():
+    # One pipeline per process (pool workers load their own copy)
+    global _paraphraser
+    if _paraphraser is None:
+        from transformers import pipeline
+        _paraphraser = pipeline("text2text-generation", model=PARAPHRASE_MODEL)
+    return _paraphraser
+
+
 def synonym_variants(question):
     variants = [question]
     for word, replacements in synonyms.items():
@@ -25,42 +36,162 @@ def synonym_variants(question):
                 variants.append(question.replace(word, r))
     return list(set(variants))  # remove duplicates
 
-def generate_paraphrases(question, num_return=3):
-    prompt = f"paraphrase: {question}"
+
+def generate_paraphrases(questions, num_return=3, batch_size=16):
+    """Paraphrases a list of questions with batched pipeline calls; returns one list per question."""
+    paraphraser = load_paraphraser()
     outputs = paraphraser(
-        prompt,
+        [f"paraphrase: {q}" for q in questions],
         num_return_sequences=num_return,
         max_length=64,
+        batch_size=batch_size,
         clean_up_tokenization_spaces=True
     )
-    return [o["generated_text"] for o in outputs]
+    # The pipeline nests per prompt only for several prompts with several sequences
+    # each; flatten and regroup by num_return so every shape reads the same
+    texts = [o["generated_text"] for out in outputs for o in (out if isinstance(out, list) else [out])]
+    if len(texts) != len(questions) * num_return:
+        raise ValueError(f"expected {len(questions) * num_return} paraphrases, got {len(texts)}")
+    return [texts[i:i + num_return] for i in range(0, len(texts), num_return)]
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def dedupe_variants(variants, threshold=0.9):
+    """
+    Drops empty, exact and near-duplicate variants (case/punctuation-insensitive,
+    similarity ratio >= threshold), keeping the first occurrence.
+    """
+    kept, kept_norm = [], []
+    for v in variants:
+        v = v.strip()
+        norm = _normalize(v)
+        if not norm:
+            continue
+        if any(norm == k or SequenceMatcher(None, norm, k).ratio() >= threshold for k in kept_norm):
+            continue
+        kept.append(v)
+        kept_norm.append(norm)
+    return kept
 
-# --- 4. Expand dataset ---
-expanded_data = []
-for item in qa_data:
-    base_q = item["question"]
-    answer = item["answer"]
 
-    # original question
-    variants = [base_q]
+def record_key(question, answer):
+    """Content hash of a Q&A pair; checkpoint records are keyed by it, not by position."""
+    return hashlib.sha1(json.dumps([question, answer], ensure_ascii=False).encode("utf-8")).hexdigest()
 
-    # add synonym-based variants
-    variants.extend(synonym_variants(base_q))
 
-    # add paraphrased variants
+def expand_chunk(chunk, num_return=3, batch_size=16, threshold=0.9):
+    """Expands [(key, item), ...] into checkpoint records."""
+    questions = [item["question"] for _, item in chunk]
     try:
-        variants.extend(generate_paraphrases(base_q))
+        paraphrases = generate_paraphrases(questions, num_return, batch_size)
     except Exception as e:
-        print(f"Paraphrasing failed for: {base_q} -> {e}")
+        print(f"Paraphrasing failed for a batch of {len(chunk)} questions -> {e}")
+        paraphrases = [[] for _ in chunk]
+
+    records = []
+    for (key, item), extra in zip(chunk, paraphrases):
+        base_q = item["question"]
+        # original question, then synonym-based and paraphrased variants
+        variants = [base_q, *synonym_variants(base_q), *extra]
+        records.append({
+            "key": key,
+            "question": base_q,
+            "answer": item["answer"],
+            "variants": dedupe_variants(variants, threshold),
+        })
+    return records
+
+
+def load_checkpoint(path):
+    """
+    Records already written to the checkpoint, by key. A torn last line from a
+    crash is ignored, as are records from an older format or whose key no
+    longer matches their question and answer.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            key = record.get("key")
+            if key and key == record_key(record.get("question"), record.get("answer")):
+                done[key] = record
+    return done
+
+
+def expand_dataset(input_path="data/qa_pairs.json", output_path="data/qa_pairs_expanded.json",
+                   checkpoint_path="data/qa_pairs_expanded.jsonl", batch_size=16, workers=1,
+                   num_return=3, threshold=0.9):
+    # --- 2. Load base Q&A dataset ---
+    with open(input_path, "r", encoding="utf-8") as f:
+        qa_data = json.load(f)
+
+    # --- 3. Resume from the checkpoint (records of edited or removed pairs are dropped) ---
+    keys = [record_key(item["question"], item["answer"]) for item in qa_data]
+    wanted = set(keys)
+    done = {k: r for k, r in load_checkpoint(checkpoint_path).items() if k in wanted}
+    if os.path.exists(checkpoint_path):
+        # Rewrite so appends start on a clean record boundary after a torn trailing line
+        with open(checkpoint_path, "w", encoding="utf-8") as f:
+            for record in done.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    pending = list({k: item for k, item in zip(keys, qa_data) if k not in done}.items())
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    print(f"{len(done)} questions already expanded, {len(pending)} to go")
+
+    # --- 4. Expand in batches, streaming every finished batch to the checkpoint ---
+    with open(checkpoint_path, "a", encoding="utf-8") as out:
+        def write(records):
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                done[record["key"]] = record
+            out.flush()
+            os.fsync(out.fileno())
+            print(f"Expanded {len(done)}/{len(wanted)} questions")
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(expand_chunk, c, num_return, batch_size, threshold) for c in chunks]
+                for future in futures:
+                    write(future.result())
+        else:
+            for chunk in chunks:
+                write(expand_chunk(chunk, num_return, batch_size, threshold))
+
+    # --- 5. Save expanded dataset ---
+    expanded_data = [
+        {"question": v, "answer": done[k]["answer"]}
+        for k in keys for v in done[k]["variants"]
+    ]
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(expanded_data, f, indent=2, ensure_ascii=False)
+
+    # The run is complete; a leftover checkpoint would only go stale
+    os.remove(checkpoint_path)
 
-    # save all unique variants mapped to same answer
-    for v in set(variants):
-        expanded_data.append({"question": v.strip(), "answer": answer})
+    print(f"Original Q&A: {len(qa_data)} → Expanded Q&A: {len(expanded_data)}")
+    print(f"✅ Expanded dataset saved to {output_path}")
+    return expanded_data
 
-print(f"Original Q&A: {len(qa_data)} → Expanded Q&A: {len(expanded_data)}")
 
-# --- 5. Save expanded dataset ---
-with open("data/qa_pairs_expanded.json", "w", encoding="utf-8") as f:
-    json.dump(expanded_data, f, indent=2, ensure_ascii=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expand the Q&A dataset with synonym and T5 paraphrase variants.")
+    parser.add_argument("--input", default="data/qa_pairs.json")
+    parser.add_argument("--output", default="data/qa_pairs_expanded.json")
+    parser.add_argument("--checkpoint", default="data/qa_pairs_expanded.jsonl",
+                        help="JSONL progress file, removed after a successful run; rerun to resume, delete to start over")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="processes, each with its own paraphraser")
+    parser.add_argument("--num-return", type=int, default=3)
+    parser.add_argument("--dedupe-threshold", type=float, default=0.9)
+    args = parser.parse_args()
 
-print("✅ Expanded dataset saved to data/qa_pairs_expanded.json")
+    expand_dataset(args.input, args.output, args.checkpoint, args.batch_size, args.workers,
+                   args.num_return, args.dedupe_threshold)
@@ -1,18 +1,85 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pdfplumber
 import re
-import json
 
-def extract_qa_from_pdf(pdf_path, output_json="data/qa_pairs.json"):
-    qa_pairs = []
+# Adjust regex based on your PDF formatting
+QA_PATTERN = re.compile(r"Q:\s*(.*?)\s*A:\s*(.*?)(?=Q:|$)", re.S)
+QUESTION_START = re.compile(r"Q:")
+
+
+def _page_texts(pdf_path, start, end):
+    # Runs in a worker process: each worker opens its own handle on the PDF
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if not text:
-                continue
-            # Adjust regex based on your PDF formatting
-            matches = re.findall(r"Q:\s*(.*?)\s*A:\s*(.*?)(?=Q:|$)", text, re.S)
-            qa_pairs.extend(matches)
+        return [pdf.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def iter_page_texts(pdf_path, workers=None, chunk_pages=8):
+    """Yields page texts in page order, extracting page chunks in a process pool."""
+    with pdfplumber.open(pdf_path) as pdf:
+        num_pages = len(pdf.pages)
+    ranges = [(s, min(s + chunk_pages, num_pages)) for s in range(0, num_pages, chunk_pages)]
+    if workers == 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield from _page_texts(pdf_path, start, end)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() returns chunks in submission order, so pages stay in sequence
+        for texts in pool.map(_page_texts, [pdf_path] * len(ranges), *zip(*ranges)):
+            yield from texts
+
+
+def iter_qa_pairs(page_texts):
+    """
+    Yields (question, answer) pairs from a stream of page texts. Text after the
+    last "Q:" of a page is carried over to the next one, so pairs that span a
+    page break are stitched together instead of being dropped.
+    """
+    carry = ""
+    for text in page_texts:
+        if not text:
+            continue
+        buffer = f"{carry}\n{text}" if carry else text
+        starts = [m.start() for m in QUESTION_START.finditer(buffer)]
+        if not starts:
+            carry = buffer
+            continue
+        # Everything before the last "Q:" is complete: its answer ends where the next question starts
+        yield from QA_PATTERN.findall(buffer[:starts[-1]])
+        carry = buffer[starts[-1]:]
+    yield from QA_PATTERN.findall(carry)
 
+
+def stream_qa_from_pdf(pdf_path, output_jsonl="data/qa_pairs.jsonl", workers=None, chunk_pages=8):
+    """Streams extracted pairs to a JSONL file as they are found. Returns (pairs, pages/sec)."""
+    pages = 0
+    count = 0
+    start = time.perf_counter()
+
+    def counted(texts):
+        nonlocal pages
+        for text in texts:
+            pages += 1
+            yield text
+
+    with open(output_jsonl, "w", encoding="utf-8") as out:
+        for q, a in iter_qa_pairs(counted(iter_page_texts(pdf_path, workers, chunk_pages))):
+            out.write(json.dumps({"question": q.strip(), "answer": a.strip()}, ensure_ascii=False) + "\n")
+            count += 1
+            if count % 100 == 0:
+                out.flush()
+                print(f"{count} pairs, {pages} pages, {pages / (time.perf_counter() - start):.1f} pages/sec")
+
+    pages_per_sec = pages / max(time.perf_counter() - start, 1e-9)
+    print(f"Extracted {count} Q&A pairs from {pages} pages ({pages_per_sec:.1f} pages/sec) → {output_jsonl}")
+    return count, pages_per_sec
+
+
+def extract_qa_from_pdf(pdf_path, output_json="data/qa_pairs.json", workers=None):
+    qa_pairs = iter_qa_pairs(iter_page_texts(pdf_path, workers))
     qa_data = [{"question": q.strip(), "answer": a.strip()} for q, a in qa_pairs]
 
     with open(output_json, "w", encoding="utf-8") as f:
@@ -20,5 +87,16 @@ def extract_qa_from_pdf(pdf_path, output_json="data/qa_pairs.json"):
 
     print(f"Extracted {len(qa_data)} Q&A pairs → {output_json}")
 
+
 if __name__ == "__main__":
-    extract_qa_from_pdf("data/SatyuktQueries.pdf")
+    parser = argparse.ArgumentParser(description="Extract Q&A pairs from a PDF.")
+    parser.add_argument("pdf", nargs="?", default="data/SatyuktQueries.pdf")
+    parser.add_argument("--stream", metavar="JSONL", help="stream pairs to this JSONL file instead of JSON")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-pages", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.stream:
+        stream_qa_from_pdf(args.pdf, args.stream, args.workers, args.chunk_pages)
+    else:
+        extract_qa_from_pdf(args.pdf, workers=args.workers)
@@ -0,0 +1,118 @@
+import time
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+METRICS = ("l2", "ip")
+
+# Query-time defaults, stored in the manifest so loaders search the way the build measured
+DEFAULT_NPROBE = 8
+DEFAULT_EF_SEARCH = 64
+
+
+def prepare_vectors(vectors, metric):
+    """float32 copy of vectors; unit-normalized for the inner-product (cosine) metric."""
+    vectors = np.array(vectors, dtype=np.float32, copy=True)
+    if metric == "ip":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def to_l2_distances(distances, metric):
+    """
+    Converts raw FAISS output to squared-L2 distances. For unit vectors
+    |a - b|^2 = 2 - 2 cos(a, b), so inner-product results slot into the same
+    1 / (1 + dist) scoring as IndexFlatL2.
+    """
+    if metric == "ip":
+        return np.maximum(2.0 - 2.0 * distances, 0.0)
+    return distances
+
+
+def _pq_subquantizers(dim):
+    for m in (48, 32, 24, 16, 12, 8, 4, 2, 1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def make_index(embeddings, index_type="flat", metric="l2"):
+    """
+    Builds and fills a FAISS index over embeddings. Returns (index, params),
+    where params holds the query-time settings to record in the manifest.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; choose one of {', '.join(INDEX_TYPES)}")
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; choose one of {', '.join(METRICS)}")
+
+    vectors = prepare_vectors(embeddings, metric)
+    n, dim = vectors.shape
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+    params = {}
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim) if metric == "ip" else faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32, faiss_metric)
+        params["ef_search"] = DEFAULT_EF_SEARCH
+    else:
+        # ~4 sqrt(n) lists, but keep at least 39 training points per list
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatIP(dim) if metric == "ip" else faiss.IndexFlatL2(dim)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss_metric)
+        else:
+            nbits = int(min(8, max(1, np.log2(max(n, 2)) - 1)))
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), nbits, faiss_metric)
+        index.train(vectors)
+        params["nprobe"] = min(DEFAULT_NPROBE, nlist)
+
+    index.add(vectors)
+    configure_index(index, params)
+    return index, params
+
+
+def configure_index(index, params):
+    """Applies query-time parameters (nprobe, efSearch) to a loaded index."""
+    if "nprobe" in params:
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+    if "ef_search" in params:
+        faiss.downcast_index(index).hnsw.efSearch = params["ef_search"]
+    return index
+
+
+def index_report(embeddings, k=10, index_types=INDEX_TYPES, metrics=METRICS, num_queries=1000, seed=0):
+    """
+    Builds every (index type, metric) pair over embeddings and measures
+    recall@k against the exact flat index of the same metric plus per-query
+    latency. Queries are a sample of the stored vectors.
+    """
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(embeddings), size=min(num_queries, len(embeddings)), replace=False)
+    rows = []
+    for metric in metrics:
+        queries = prepare_vectors(np.asarray(embeddings)[sample], metric)
+        truth = None
+        for index_type in ("flat", *[t for t in index_types if t != "flat"]):
+            start = time.perf_counter()
+            index, params = make_index(embeddings, index_type, metric)
+            build_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            _, found = index.search(queries, k)
+            latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            if truth is None:
+                truth = found
+            recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+            rows.append({
+                "index_type": index_type,
+                "metric": metric,
+                "recall_at_k": float(recall),
+                "k": k,
+                "latency_ms": latency_ms,
+                "build_seconds": build_seconds,
+                "params": params,
+            })
+    return rows
@@ -0,0 +1,230 @@
+import bisect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Fraction of requests whose stage timings are measured and logged; counters are always exact
+SAMPLE_RATE = float(os.environ.get("CHATBOT_METRICS_SAMPLE", "0.1"))
+
+# Print the startup profile once the search models have loaded
+PRINT_STARTUP = os.environ.get("CHATBOT_STARTUP_PROFILE", "") not in ("", "0")
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("chatbot.metrics")
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def _format(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Registry:
+    """In-process counters and latency histograms, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            i = bisect.bisect_left(BUCKETS, seconds)
+            if i < len(BUCKETS):
+                hist[0][i] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    def value(self, name, **labels):
+        return self._counters.get(_key(name, labels), 0)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            family = None
+            for (name, labels), value in sorted(self._counters.items()):
+                if name != family:
+                    family = name
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{_format(name, labels)} {value}")
+            for (name, labels), (buckets, total, count) in sorted(self._histograms.items()):
+                if name != family:
+                    family = name
+                    lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, n in zip(BUCKETS, buckets):
+                    cumulative += n
+                    lines.append(f"{_format(name + '_bucket', labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{_format(name + '_bucket', labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{_format(name + '_sum', labels)} {total}")
+                lines.append(f"{_format(name + '_count', labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def inc(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+
+class _Stage:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.trace.stages[self.name] = self.trace.stages.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+class Trace:
+    """
+    Per-request timing. Unsampled traces cost one random() call: stage()
+    returns a shared no-op context and finish() does nothing.
+
+        trace = metrics.trace("search")
+        with trace.stage("encode"):
+            ...
+        trace.finish(queries=3)
+    """
+
+    __slots__ = ("name", "sampled", "stages", "start")
+
+    def __init__(self, name, sampled):
+        self.name = name
+        self.sampled = sampled
+        self.stages = {}
+        self.start = time.perf_counter() if sampled else 0.0
+
+    def stage(self, name):
+        return _Stage(self, name) if self.sampled else _NO_STAGE
+
+    def finish(self, **fields):
+        if not self.sampled:
+            return
+        total = time.perf_counter() - self.start
+        for stage, seconds in self.stages.items():
+            REGISTRY.observe(f"{self.name}_stage_seconds", seconds, stage=stage)
+        REGISTRY.observe(f"{self.name}_seconds", total)
+        if logger.isEnabledFor(logging.INFO):
+            record = {"event": self.name, "total_ms": round(total * 1000, 3),
+                      **{f"{k}_ms": round(v * 1000, 3) for k, v in self.stages.items()}, **fields}
+            logger.info(json.dumps(record, default=str))
+
+
+def trace(name, sample_rate=None):
+    rate = SAMPLE_RATE if sample_rate is None else sample_rate
+    return Trace(name, rate >= 1.0 or random.random() < rate)
+
+
+class StartupProfile:
+    """
+    Wall time of each startup step (imports, bundle, encoder, BM25, ...), in
+    the order they ran. Steps may run on a background thread.
+
+        with metrics.STARTUP.step("import rank"):
+            from rank import HybridChatBot
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.steps = []
+
+    def step(self, name):
+        return _StartupStep(self, name)
+
+    def record(self, name, seconds, started):
+        with self._lock:
+            self.steps.append({"step": name, "seconds": round(seconds, 4),
+                               "at": round(started - self.origin, 4),
+                               "thread": threading.current_thread().name})
+        REGISTRY.inc("startup_step_seconds", seconds, step=name)
+        logger.info(json.dumps({"event": "startup", "step": name, "ms": round(seconds * 1000, 3)}))
+
+    def report(self):
+        """Steps as a list of dicts (seconds, offset from process start, thread)."""
+        with self._lock:
+            return list(self.steps)
+
+    def format(self):
+        lines = [f"{s['at'] * 1000:8.1f} ms  +{s['seconds'] * 1000:8.1f} ms  {s['step']} ({s['thread']})"
+                 for s in self.report()]
+        return "\n".join(["Startup profile (start offset, duration, step):", *lines])
+
+
+class _StartupStep:
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profile.record(self.name, time.perf_counter() - self.start, self.start)
+
+
+# Process-wide startup profile; its origin is the first import of this module
+STARTUP = StartupProfile()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serves GET /metrics from a daemon thread (for front ends without their own HTTP server)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
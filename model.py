@@ -1,22 +1,43 @@
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
+from artifacts import load_bundle
+from cache import EmbeddingCache
+from encoders import load_encoder
+import metrics
 
 class ChatBot:
-    def __init__(self, model_name="all-MiniLM-L6-v2", index_file="data/faiss.index"):
-        self.model = SentenceTransformer(model_name)
-        self.index = faiss.read_index(index_file)
-        self.questions = np.load("data/questions.npy", allow_pickle=True)
-        self.answers = np.load("data/answers.npy", allow_pickle=True)
+    def __init__(self, model_name="all-MiniLM-L6-v2", bundle_dir="data/bundle", cache_size=4096, cache_path=None,
+                 encoder_backend=None):
+        self.model = load_encoder(model_name, encoder_backend)
+        self.cache = EmbeddingCache(max_size=cache_size, path=cache_path, namespace=self.model.name)
+        self.bundle_dir = bundle_dir
+        self.bundle = load_bundle(bundle_dir)
+        self.index = self.bundle.index
+        self.questions = self.bundle.questions
+        self.answers = self.bundle.answers
+
+    def reload(self, bundle_dir=None):
+        """Swaps in the current generation of bundle_dir; searches in flight finish on the old bundle."""
+        bundle = load_bundle(bundle_dir or self.bundle_dir)
+        bundle.index  # open the index before the swap, not on the first query
+        self.bundle = bundle
+        self.index, self.questions, self.answers = bundle.index, bundle.questions, bundle.answers
+        return bundle.generation
 
     def search(self, query, top_k=1):
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-        distances, indices = self.index.search(query_embedding, top_k)
+        bundle = self.bundle
+        trace = metrics.trace("chatbot_search")
+        with trace.stage("encode"):
+            query_embedding = self.cache.encode(self._encode, [query])
+        with trace.stage("faiss"):
+            distances, indices = bundle.search(query_embedding, top_k)
         results = []
         for i, idx in enumerate(indices[0]):
             results.append({
-                "matched_question": self.questions[idx],
-                "answer": self.answers[idx],
+                "matched_question": bundle.questions[idx],
+                "answer": bundle.answers[idx],
                 "score": float(distances[0][i])
             })
+        trace.finish(top_k=top_k)
         return results
+
+    def _encode(self, queries):
+        return self.model.encode(queries)
@@ -1,7 +1,12 @@
+import os
+import threading
+import time
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from rank_bm25 import BM25Okapi
+from artifacts import current_generation, load_bundle, set_current
+from bm25 import SparseBM25, tokenize
+from cache import EmbeddingCache, normalize
+from encoders import AGREEMENT_THRESHOLD, check_agreement, load_encoder
+import metrics
 
 # class HybridChatBot:
 #     def __init__(self, model_name="all-MiniLM-L6-v2", index_file="Chatbot/data/faiss.index"):
@@ -48,36 +53,411 @@ from rank_bm25 import BM25Okapi
 #                 "score": float(score)
 #             })
 #         return results
+def question_key(text):
+    """Exact-match key: case, whitespace and trailing punctuation are ignored."""
+    return normalize(text).rstrip("?!. ")
+
+
+class Snapshot:
+    """
+    Everything a search reads from one bundle generation: the tables, the
+    exact-match map, BM25 and the FAISS index. A search takes the bot's
+    current snapshot once and uses it throughout, so a reload that swaps in
+    a new snapshot never mixes generations inside one request.
+    """
+
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.questions = bundle.questions
+        self.answers = bundle.answers
+        self.answer_ids = bundle.answer_ids
+        self.bm25 = None
+
+        # Known questions → id, for the exact-match fast path (first occurrence wins)
+        self.exact_ids = {}
+        for i, q in enumerate(self.questions):
+            self.exact_ids.setdefault(question_key(q), i)
+
+    @property
+    def generation(self):
+        return self.bundle.generation
+
+    def load(self):
+        """Opens the FAISS index and builds BM25 (the part that needs more than the mapped tables)."""
+        self.index = self.bundle.index
+
+        # Prepare BM25 (inverted index, scores only documents sharing a query term)
+        tokenized_corpus = [tokenize(q) for q in self.questions]
+        self.bm25 = SparseBM25(tokenized_corpus)
+        return self
+
+
 class HybridChatBot:
-    def __init__(self, model_name="all-MiniLM-L6-v2", index_file="data/faiss.index", fallback_threshold=0.05):
-        # Load embeddings index
-        self.model = SentenceTransformer(model_name)
-        self.index = faiss.read_index(index_file)
-        self.questions = np.load("data/questions.npy", allow_pickle=True)
-        self.answers = np.load("data/answers.npy", allow_pickle=True)
+    def __init__(self, model_name="all-MiniLM-L6-v2", bundle_dir="data/bundle", fallback_threshold=0.05,
+                 cache_size=4096, cache_path=None, encoder_backend=None, lazy=False):
+        """
+        With lazy=True only the memory-mapped bundle and the exact-match table
+        are loaded here; the encoder, the FAISS index and BM25 load (and the
+        encoder is warmed up) on a background thread. Stored questions are
+        answered right away, other queries wait for the ready event.
+
+        bundle_dir may be a generation root (see artifacts.write_generation);
+        reload() and watch() pick up newer generations without a restart.
+        """
+        self.model_name = model_name
+        self.encoder_backend = encoder_backend
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.bundle_dir = bundle_dir
+        self.ready = threading.Event()
+        self.load_error = None
 
-        # Prepare BM25
-        tokenized_corpus = [q.lower().split() for q in self.questions]
-        self.bm25 = BM25Okapi(tokenized_corpus)
+        # Callables run with the new bundle after every reload/rollback (e.g. RecommenderEngine.reload)
+        self.on_reload = []
+        self.previous = None
+        self.rejected = set()
+        self._reload_lock = threading.Lock()
+
+        # Load embeddings index (memory-mapped artifact bundle) and the exact-match table
+        with metrics.STARTUP.step("load bundle"):
+            self.snapshot = Snapshot(load_bundle(bundle_dir))
 
         # Threshold for fallback
         self.fallback_threshold = fallback_threshold
 
-    def search(self, query, top_k=5, alpha=0.5):
+        # Candidate depth multiplier used when collapsing results by answer
+        self.collapse_depth = 4
+
+        if lazy:
+            threading.Thread(target=self._load, name="chatbot-warm-up", daemon=True).start()
+        else:
+            self._load()
+            if self.load_error is not None:
+                raise self.load_error
+
+    # Views of the current snapshot, for callers that only read one table
+    @property
+    def bundle(self):
+        return self.snapshot.bundle
+
+    @property
+    def questions(self):
+        return self.snapshot.questions
+
+    @property
+    def answers(self):
+        return self.snapshot.answers
+
+    @property
+    def answer_ids(self):
+        return self.snapshot.answer_ids
+
+    @property
+    def exact_ids(self):
+        return self.snapshot.exact_ids
+
+    @property
+    def bm25(self):
+        return self.snapshot.bm25
+
+    @property
+    def index(self):
+        return self.snapshot.index
+
+    def _load(self):
+        try:
+            with metrics.STARTUP.step("load encoder"):
+                self.model = load_encoder(self.model_name, self.encoder_backend)
+            self.cache = EmbeddingCache(max_size=self.cache_size, path=self.cache_path, namespace=self.model.name)
+            with metrics.STARTUP.step("load faiss index and bm25"):
+                self.snapshot.load()
+            # Same check as reload(), so a bundle is never served at startup that a reload would reject
+            with metrics.STARTUP.step("check bundle"):
+                self._check(self.snapshot)
+
+            # The first encode call pays for lazy kernel/graph setup; take it off the first query
+            with metrics.STARTUP.step("warm up encoder"):
+                self.model.encode(["warm up"])
+        except Exception as e:
+            self.load_error = e
+            print(f"❌ Loading the search models failed -> {e}")
+        finally:
+            self.ready.set()
+            if metrics.PRINT_STARTUP:
+                print(metrics.STARTUP.format())
+
+    def wait_ready(self, timeout=None):
+        """Blocks until the background load has finished. Returns False on timeout."""
+        if not self.ready.wait(timeout):
+            return False
+        if self.load_error is not None:
+            raise RuntimeError(f"Search models failed to load: {self.load_error}")
+        return True
+
+    # --- Hot reload ---
+    def reload(self, bundle_dir=None):
+        """
+        Loads the current generation of bundle_dir (default: the one the bot
+        was started with), checks it and swaps it in. Searches already running
+        finish on the old snapshot, which is kept for rollback(). Returns the
+        new generation name; raises ValueError and keeps serving the old
+        snapshot if the check fails.
+        """
+        self.wait_ready()
+        with self._reload_lock:
+            root = bundle_dir or self.bundle_dir
+            # Named before loading, so a generation that fails to load is rejected (not retried) too
+            generation = current_generation(root) or os.path.basename(os.path.normpath(root))
+            try:
+                bundle = load_bundle(root)
+                generation = bundle.generation
+                snapshot = Snapshot(bundle).load()
+                self._check(snapshot)
+                self._swap(snapshot)
+            except Exception as e:
+                self.rejected.add(generation)
+                metrics.inc("reload_total", outcome="rejected")
+                raise ValueError(f"Generation {generation} rejected: {e}") from e
+            metrics.inc("reload_total", outcome="ok")
+            print(f"✅ Serving generation {snapshot.generation} ({len(bundle)} questions)")
+            return snapshot.generation
+
+    def rollback(self):
+        """
+        Swaps the previous snapshot back in. When bundle_dir is a generation
+        root, CURRENT is pointed at it too, so watch() (here and in other
+        processes on the same root) does not reload the rolled-back
+        generation. Returns its generation name.
+        """
+        with self._reload_lock:
+            if self.previous is None:
+                raise ValueError("No previous generation to roll back to")
+            pointer = current_generation(self.bundle_dir)
+            if pointer is not None:
+                set_current(self.bundle_dir, self.previous.generation)
+            try:
+                self._swap(self.previous)
+            except Exception:
+                if pointer is not None:
+                    set_current(self.bundle_dir, pointer)
+                raise
+            metrics.inc("reload_total", outcome="rollback")
+            print(f"↩️ Rolled back to generation {self.snapshot.generation}")
+            return self.snapshot.generation
+
+    def watch(self, interval=5.0):
+        """
+        Polls bundle_dir on a daemon thread and reloads whenever its CURRENT
+        pointer names a generation other than the one being served. Rejected
+        generations are not retried until the pointer moves again.
+        """
+        def poll():
+            while True:
+                time.sleep(interval)
+                generation = current_generation(self.bundle_dir)
+                if generation is None or generation == self.snapshot.generation or generation in self.rejected:
+                    continue
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"⚠️ Reload failed, still serving {self.snapshot.generation} -> {e}")
+
+        thread = threading.Thread(target=poll, name="chatbot-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def _swap(self, snapshot):
+        # Callbacks switch first; if one fails, those already switched go back and the swap is abandoned
+        switched = []
+        try:
+            for callback in self.on_reload:
+                callback(snapshot.bundle)
+                switched.append(callback)
+        except Exception:
+            for callback in switched:
+                callback(self.snapshot.bundle)
+            raise
+        # One attribute assignment: each search sees either the old or the new snapshot
+        self.previous, self.snapshot = self.snapshot, snapshot
+
+    def _check(self, snapshot, sample=32):
+        """Sanity checks a loaded snapshot before it is served."""
+        bundle = snapshot.bundle
+        manifest = bundle.manifest
+        if len(bundle) == 0:
+            raise ValueError("bundle is empty")
+        if not len(snapshot.questions) == len(bundle.embeddings) == len(snapshot.answer_ids) == len(bundle):
+            raise ValueError("questions, embeddings and answer ids disagree on the question count")
+        if snapshot.index.ntotal != len(bundle):
+            raise ValueError(f"index holds {snapshot.index.ntotal} vectors for {len(bundle)} questions")
+        if int(np.max(snapshot.answer_ids)) >= len(bundle.unique_answers):
+            raise ValueError("answer ids point past the answer table")
+        if manifest.get("model_name", self.model_name) != self.model_name:
+            raise ValueError(f"built with {manifest['model_name']}, serving {self.model_name}")
+        probe = self.model.encode([str(snapshot.questions[0])])
+        if probe.shape[1] != bundle.embeddings.shape[1]:
+            raise ValueError(f"encoder dimension {probe.shape[1]} != bundle dimension {bundle.embeddings.shape[1]}")
+
+        # The served encoder (possibly another backend than the build's) must find what the stored vectors find
+        agreement, _ = check_agreement(self.model, bundle, k=5, sample=sample)
+        if agreement < AGREEMENT_THRESHOLD:
+            raise ValueError(f"{self.model.name} agrees with the stored embeddings on {agreement:.0%} of top-5 "
+                             f"neighbours (need {AGREEMENT_THRESHOLD:.0%})")
+
+    def search(self, query, top_k=5, alpha=0.5, collapse=True):
         """
         Hybrid search:
         alpha = weight for BM25 vs embeddings (0.5 = equal weight)
         """
+        return self.search_many([query], top_k=top_k, alpha=alpha, collapse=collapse)[0]
+
+    def search_many(self, queries, top_k=5, alpha=0.5, collapse=True):
+        """
+        Batched hybrid search: one encode call, one FAISS search and one BM25
+        pass for the whole batch. Returns one result list per query, identical
+        to calling search() on each query.
+
+        With collapse=True, paraphrases that share an answer are merged (the
+        best-scoring one is kept), so the results are top_k distinct answers.
+
+        Queries that are (trivially normalized) stored questions are answered
+        straight from the stored answer with a single result of score 1.0.
+        """
+        return self._search(queries, top_k, alpha, collapse)[0]
+
+    def respond(self, query, top_k=5, alpha=0.5, num_recommendations=5):
+        """
+        Answer and related questions in one pass. Returns
+        {"results": [...], "recommendations": [...]}; see respond_many().
+        """
+        return self.respond_many([query], top_k=top_k, alpha=alpha, num_recommendations=num_recommendations)[0]
+
+    def respond_many(self, queries, top_k=5, alpha=0.5, num_recommendations=5):
+        """
+        Like search_many(), but also returns related questions for each query,
+        taken from the same FAISS neighbours that produced the answer (or from
+        the precomputed neighbour table for exact matches). The query is
+        encoded once and the index is searched once for both. Related
+        questions have distinct answers, none of them the answer shown.
+        An empty list means the search fell back, so the caller should offer
+        its default questions.
+        """
+        # Each recommendation needs a distinct answer, so fetch a few paraphrases deep
+        depth = (num_recommendations + 1) * self.collapse_depth
+        snapshot = self.snapshot
+        results, neighbors = self._search(queries, top_k, alpha, True, depth, snapshot)
+        responses = []
+        for result, candidates in zip(results, neighbors):
+            matched = result[0]["matched_question"]
+            if matched is None:
+                recommendations = []
+            else:
+                answered_idx = snapshot.exact_ids[question_key(matched)]
+                recommendations = self._related(snapshot, candidates, answered_idx, num_recommendations)
+                if len(recommendations) < num_recommendations and len(candidates) < depth:
+                    # The neighbour table row ran out of distinct answers; search the index as deep as a query
+                    bundle = snapshot.bundle
+                    candidates = bundle.search(bundle.embeddings[answered_idx:answered_idx + 1], depth)[1][0]
+                    recommendations = self._related(snapshot, candidates, answered_idx, num_recommendations)
+            responses.append({"results": result, "recommendations": recommendations})
+        return responses
+
+    def _related(self, snapshot, candidates, answered_idx, limit):
+        answer_ids = snapshot.answer_ids
+        seen = {answer_ids[answered_idx]}
+        related = []
+        for idx in candidates:
+            if idx < 0 or answer_ids[idx] in seen:
+                continue
+            seen.add(answer_ids[idx])
+            related.append(snapshot.questions[idx])
+            if len(related) == limit:
+                break
+        return related
+
+    def _search(self, queries, top_k, alpha, collapse, neighbor_depth=0, snapshot=None):
+        """
+        Returns (results, neighbors). With neighbor_depth > 0, neighbors[row]
+        lists candidate question ids nearest to the query, best first. Ids
+        refer to snapshot (default: the current one).
+        """
+        snapshot = snapshot or self.snapshot
+        queries = list(queries)
+        if not queries:
+            return [], []
+        metrics.inc("search_queries_total", len(queries))
+
+        # --- Exact-match fast path: known questions skip encoding, FAISS and BM25 ---
+        results = [None] * len(queries)
+        neighbors = [None] * len(queries)
+        for row, query in enumerate(queries):
+            idx = snapshot.exact_ids.get(question_key(query))
+            if idx is not None:
+                results[row] = [{
+                    "matched_question": snapshot.questions[idx],
+                    "answer": snapshot.answers[idx],
+                    "score": 1.0
+                }]
+                if neighbor_depth:
+                    neighbors[row] = self._stored_neighbors(snapshot, idx, neighbor_depth)
+        rows = [row for row, r in enumerate(results) if r is None]
+        if len(rows) < len(queries):
+            metrics.inc("search_exact_match_total", len(queries) - len(rows))
+        if not rows:
+            return results, neighbors
+        queries = [queries[row] for row in rows]
+        self.wait_ready()
+        trace = metrics.trace("search")
+        # Paraphrases crowd the candidate lists, so look deeper when collapsing them
+        depth = top_k * self.collapse_depth if collapse else top_k
+
         # --- Embedding Search ---
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-        distances, indices = self.index.search(query_embedding, top_k)
-        embedding_scores = {idx: 1/(1+dist) for idx, dist in zip(indices[0], distances[0])}
+        with trace.stage("encode"):
+            query_embeddings = self.cache.encode(self._encode, queries)
+        with trace.stage("faiss"):
+            distances, indices = snapshot.bundle.search(query_embeddings, max(depth, neighbor_depth))
 
         # --- BM25 Search ---
-        bm25_scores = self.bm25.get_scores(query.lower().split())
-        bm25_top = np.argsort(bm25_scores)[::-1][:top_k]
-        bm25_scores = {idx: bm25_scores[idx] for idx in bm25_top}
+        with trace.stage("bm25"):
+            bm25_top = snapshot.bm25.top_k_many([tokenize(q) for q in queries], depth)
 
+        with trace.stage("fusion"):
+            fused = []
+            for row in range(len(queries)):
+                emb_ids, emb_dist = indices[row, :depth], distances[row, :depth]
+                bm25_ids, bm25_scores = bm25_top[row]
+                # Fuse at top_k depth, as without collapsing; the rest only fills in distinct answers
+                fused.append(self._combine(
+                    snapshot,
+                    {idx: 1/(1+dist) for idx, dist in zip(emb_ids[:top_k], emb_dist[:top_k])},
+                    dict(zip(bm25_ids[:top_k], bm25_scores[:top_k])),
+                    top_k,
+                    alpha,
+                    collapse,
+                    tail=(
+                        {idx: 1/(1+dist) for idx, dist in zip(emb_ids[top_k:], emb_dist[top_k:])},
+                        dict(zip(bm25_ids[top_k:], bm25_scores[top_k:])),
+                    ),
+                ))
+        for i, (row, result) in enumerate(zip(rows, fused)):
+            results[row] = result
+            if neighbor_depth:
+                neighbors[row] = indices[i]
+        trace.finish(queries=len(queries), top_k=top_k, alpha=alpha, generation=snapshot.generation)
+        return results, neighbors
+
+    def _stored_neighbors(self, snapshot, idx, depth):
+        # Neighbour table from the bundle; an index lookup only for bundles built without it
+        bundle = snapshot.bundle
+        if bundle.neighbors is not None:
+            return bundle.neighbors[idx]
+        return bundle.search(bundle.embeddings[idx:idx + 1], depth)[1][0]
+
+    def _encode(self, queries):
+        return self.model.encode(queries)
+
+    @staticmethod
+    def _fuse(embedding_scores, bm25_scores, alpha):
         # --- Combine Scores ---
         combined_scores = {}
         for idx in set(list(embedding_scores.keys()) + list(bm25_scores.keys())):
@@ -86,11 +466,33 @@ class HybridChatBot:
             combined_scores[idx] = alpha * bm_score + (1 - alpha) * emb_score
 
         # --- Sort and Return ---
-        best = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+        return sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+
+    @staticmethod
+    def _distinct(snapshot, best, seen):
+        # First candidate of each answer; seen carries over between calls
+        return [(idx, score) for idx, score in best
+                if idx >= 0 and not (snapshot.answer_ids[idx] in seen or seen.add(snapshot.answer_ids[idx]))]
+
+    def _combine(self, snapshot, embedding_scores, bm25_scores, top_k, alpha, collapse=False, tail=None):
+        """
+        Fuses the top_k candidates of each retriever. With collapse, paraphrases
+        of an answer already listed are dropped and, if that leaves fewer than
+        top_k answers, the deeper tail candidates fill the remaining slots.
+        """
+        best = self._fuse(embedding_scores, bm25_scores, alpha)
+        if collapse:
+            seen = set()
+            best = self._distinct(snapshot, best, seen)
+            if len(best) < top_k and tail is not None:
+                head = set(embedding_scores) | set(bm25_scores)
+                extra = [(idx, score) for idx, score in self._fuse(*tail, alpha) if idx not in head]
+                best += self._distinct(snapshot, extra, seen)
 
         results = []
         if not best or best[0][1] < self.fallback_threshold:
             # Low confidence → fallback message
+            metrics.inc("search_fallback_total")
             results.append({
                 "matched_question": None,
                 "answer": "Sorry, I couldn't find a reliable answer. Please contact our support team.",
@@ -99,8 +501,8 @@ class HybridChatBot:
         else:
             for idx, score in best[:top_k]:
                 results.append({
-                    "matched_question": self.questions[idx],
-                    "answer": self.answers[idx],
+                    "matched_question": snapshot.questions[idx],
+                    "answer": snapshot.answers[idx],
                     "score": float(score)
                 })
 
@@ -1,29 +1,103 @@
 # recommend.py
-import faiss
-import numpy as np
+from collections import deque
+from artifacts import build_neighbors, load_bundle
+import metrics
 
-class QuestionRecommender:
-    def __init__(self, faiss_index_path, questions_path, top_k=5):
-        self.index = faiss.read_index(faiss_index_path)
-        self.questions = np.load(questions_path, allow_pickle=True)
+
+class RecommenderEngine:
+    """
+    Shared, read-only part of the recommender: the question table, the
+    question → id map and the neighbour table. One instance serves every
+    session; only reload() changes it, by swapping all tables at once.
+    """
+
+    def __init__(self, bundle_dir="data/bundle", top_k=5, bundle=None):
         self.top_k = top_k
-        self.start_questions = [
+        self.start_questions = (
             "What is Sat2Farm?",
             "Can someone without farming background do farming using your advisories?",
             "How to add my farm in the App?",
             "Is the app available for Iphone?",
             "Is the app free?",
+        )
+        self.reload(bundle or load_bundle(bundle_dir))
+
+    def reload(self, bundle):
+        """
+        Switches to another bundle (e.g. a new generation). The tables are
+        built first and swapped in with one assignment, so similar() calls in
+        flight finish on the old ones.
+        """
+        # Question → id map (first occurrence wins, like the old np.where lookup)
+        question_ids = {}
+        for i, q in enumerate(bundle.questions):
+            question_ids.setdefault(str(q), i)
+
+        # Precomputed neighbour table; rebuilt from the index only if missing or too narrow
+        neighbors = bundle.neighbors
+        if neighbors is None or neighbors.shape[1] < self.top_k + 1:
+            neighbors = build_neighbors(bundle.index, bundle.embeddings, max(self.top_k, 10))
+        self._tables = (bundle, question_ids, neighbors)
+
+    @property
+    def bundle(self):
+        return self._tables[0]
+
+    @property
+    def questions(self):
+        return self._tables[0].questions
+
+    @property
+    def question_ids(self):
+        return self._tables[1]
+
+    @property
+    def neighbors(self):
+        return self._tables[2]
+
+    def similar(self, selected_question):
+        """
+        Questions most similar to a known question, from the precomputed
+        neighbour table. Returns None if the question is not in the dataset.
+        """
+        bundle, question_ids, neighbors = self._tables
+        questions = bundle.questions
+        q_idx = question_ids.get(selected_question)
+        if q_idx is None:
+            return None
+
+        # Exclude the same question itself
+        recommended = [
+            questions[i] for i in neighbors[q_idx]
+            if 0 <= i < len(questions) and questions[i] != selected_question
         ]
-        # --- NEW: State management ---
-        self.history = []
+        return recommended[:self.top_k]
+
+
+class RecommenderSession:
+    """
+    Per-user navigation state on top of a shared RecommenderEngine: the
+    current recommendations and a bounded history for "back".
+    """
+
+    def __init__(self, engine, max_history=20):
+        self.engine = engine
+        self.history = deque(maxlen=max_history)
         self.current_recommendations = []
 
+    @property
+    def start_questions(self):
+        return list(self.engine.start_questions)
+
+    def similar(self, selected_question):
+        return self.engine.similar(selected_question)
+
     def get_initial_questions(self):
         """
         Gets the initial set of questions and resets the state for a new session.
         """
         # Reset history and set the initial questions as the current ones
-        self.history = []
+        self.history.clear()
         self.current_recommendations = self.start_questions
         return self.current_recommendations
 
@@ -32,31 +106,35 @@ class QuestionRecommender:
         Recommend questions based on similarity search and saves the previous state.
         """
         # --- NEW: Save the current list of questions to history before changing it ---
+        # (the oldest entry is dropped once max_history is reached)
         if self.current_recommendations:
             self.history.append(self.current_recommendations)
 
-        # Find the index of the selected question in dataset
-        try:
-            q_idx = np.where(self.questions == selected_question)[0][0]
-        except IndexError:
+        trace = metrics.trace("recommend")
+        with trace.stage("lookup"):
+            recommended = self.engine.similar(selected_question)
+        trace.finish(known=recommended is not None)
+        metrics.inc("recommend_requests_total", known=recommended is not None)
+        if recommended is None:
             # Fallback for questions not in the original list (e.g., user-typed query)
             # This part requires a model to embed the query, which is beyond this scope.
             # For now, we'll just return the initial questions as a safe fallback.
             print("⚠️ User-typed question, cannot find exact embedding. Reverting to initial questions.")
             return self.start_questions
 
-        # Search similar questions
-        embedding = self.index.reconstruct(int(q_idx)).reshape(1, -1)
-        distances, indices = self.index.search(embedding, self.top_k + 1)
-
-        # Exclude the same question itself
-        recommended = [
-            self.questions[i] for i in indices[0]
-            if i < len(self.questions) and self.questions[i] != selected_question
-        ]
-        
         # --- NEW: Update the current recommendations ---
-        self.current_recommendations = recommended[:self.top_k]
+        self.current_recommendations = recommended
+        return self.current_recommendations
+
+    def show(self, recommendations):
+        """
+        Records recommendations computed elsewhere (e.g. HybridChatBot.respond)
+        as the current list, saving the previous one to history. An empty
+        list falls back to the initial questions.
+        """
+        if self.current_recommendations:
+            self.history.append(self.current_recommendations)
+        self.current_recommendations = list(recommendations) or self.start_questions
         return self.current_recommendations
 
     def go_back(self):
@@ -70,4 +148,11 @@ class QuestionRecommender:
         else:
             # If there's no history, return the initial set of questions
             print("💡 No more history. Returning to initial questions.")
-            return self.get_initial_questions()
\ No newline at end of file
+            return self.get_initial_questions()
+
+
+class QuestionRecommender(RecommenderSession):
+    """A private engine plus one session, for single-user front ends such as test.py."""
+
+    def __init__(self, bundle_dir="data/bundle", top_k=5, max_history=20):
+        super().__init__(RecommenderEngine(bundle_dir, top_k), max_history)
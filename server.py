@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+import metrics
+with metrics.STARTUP.step("import rank"):
+    from rank import HybridChatBot
+from recommender import RecommenderEngine
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to max_wait seconds (or max_batch
+    items) and hands them to batch_fn as one call on a worker thread, so the
+    event loop never runs model or FAISS code.
+
+    batch_fn(key, items) -> list of results, one per item. Requests with
+    different keys (e.g. different top_k / alpha) are batched separately.
+    """
+
+    def __init__(self, batch_fn, max_batch=32, max_wait=0.005, executor=None):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, key, item):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, item, future))
+        return await future
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self.executor.shutdown(wait=False)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(pending) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = {}
+            for key, item, future in pending:
+                groups.setdefault(key, []).append((item, future))
+            for key, entries in groups.items():
+                items = [item for item, _ in entries]
+                metrics.inc("http_batches_total")
+                metrics.inc("http_batched_queries_total", len(items))
+                try:
+                    results = await loop.run_in_executor(self.executor, self.batch_fn, key, items)
+                except Exception as e:
+                    for _, future in entries:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), result in zip(entries, results):
+                    if not future.done():
+                        future.set_result(result)
+
+
+# Largest top_k a client may ask for
+MAX_TOP_K = 50
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="body must be a JSON object")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="body must be a JSON object")
+    return body
+
+
+def _search_params(body):
+    """(query, top_k, alpha) from a request body; HTTPBadRequest with the reason if invalid."""
+    query = str(body.get("query", "")).strip()
+    if not query:
+        raise web.HTTPBadRequest(text="query is required")
+    top_k, alpha = body.get("top_k", 5), body.get("alpha", 0.8)
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K:
+        raise web.HTTPBadRequest(text=f"top_k must be an integer between 1 and {MAX_TOP_K}")
+    # NaN fails both comparisons, infinities the range check
+    if isinstance(alpha, bool) or not isinstance(alpha, (int, float)) or not 0.0 <= alpha <= 1.0:
+        raise web.HTTPBadRequest(text="alpha must be a number between 0 and 1")
+    return query, top_k, float(alpha)
+
+
+async def answer(request):
+    query, top_k, alpha = _search_params(await _json_body(request))
+    key = ("search", top_k, alpha)
+    trace = metrics.trace("http_answer")
+    with trace.stage("batched_search"):
+        results = await request.app["batcher"].submit(key, query)
+    trace.finish()
+    metrics.inc("http_requests_total", endpoint="answer")
+    return web.json_response({"results": results})
+
+
+async def respond(request):
+    query, top_k, alpha = _search_params(await _json_body(request))
+    metrics.inc("http_requests_total", endpoint="respond")
+    key = ("respond", top_k, alpha)
+    response = await request.app["batcher"].submit(key, query)
+    if not response["recommendations"]:
+        response = {**response, "recommendations": request.app["recommender"].start_questions}
+    return web.json_response(response)
+
+
+async def recommend(request):
+    body = await _json_body(request)
+    metrics.inc("http_requests_total", endpoint="recommend")
+    recommender = request.app["recommender"]
+    question = body.get("question")
+    if not question:
+        return web.json_response({"recommendations": recommender.start_questions})
+    recommended = recommender.similar(question)
+    if recommended is None:
+        recommended = recommender.start_questions
+    return web.json_response({"recommendations": recommended})
+
+
+async def health(request):
+    return web.json_response({"status": "ok"})
+
+
+async def ready(request):
+    """Readiness: 503 until the background model load has finished, with the startup profile."""
+    bot = request.app["bot"]
+    if not bot.ready.is_set():
+        status, code = "loading", 503
+    elif bot.load_error is not None:
+        status, code = f"failed: {bot.load_error}", 503
+    else:
+        status, code = "ready", 200
+    return web.json_response({"status": status, "generation": bot.snapshot.generation,
+                              "startup": metrics.STARTUP.report()}, status=code)
+
+
+def _check_admin(request):
+    """Admin endpoints need "Authorization: Bearer <admin token>"."""
+    expected = f"Bearer {request.app['admin_token']}"
+    if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected.encode()):
+        raise web.HTTPUnauthorized(text="admin token required")
+
+
+async def reload(request):
+    """Loads, checks and swaps in the current bundle generation (run off the event loop)."""
+    _check_admin(request)
+    bot = request.app["bot"]
+    loop = asyncio.get_running_loop()
+    try:
+        generation = await loop.run_in_executor(None, bot.reload)
+    except ValueError as e:
+        return web.json_response({"status": "rejected", "error": str(e),
+                                  "generation": bot.snapshot.generation}, status=409)
+    return web.json_response({"status": "ok", "generation": generation})
+
+
+async def rollback(request):
+    """Swaps the previous generation back in (run off the event loop: callbacks and the CURRENT write block)."""
+    _check_admin(request)
+    bot = request.app["bot"]
+    loop = asyncio.get_running_loop()
+    try:
+        generation = await loop.run_in_executor(None, bot.rollback)
+    except ValueError as e:
+        return web.json_response({"status": "error", "error": str(e)}, status=409)
+    return web.json_response({"status": "ok", "generation": generation})
+
+
+async def metrics_endpoint(request):
+    return web.Response(text=metrics.REGISTRY.render(), content_type="text/plain")
+
+
+def create_app(bot, recommender, max_batch=32, max_wait=0.005, admin_token=None):
+    """
+    The /admin endpoints (reload, rollback) are only mounted when an
+    admin_token is given, and then require it as a bearer token.
+    """
+    app = web.Application()
+    app["bot"] = bot
+    app["admin_token"] = admin_token
+    app["recommender"] = recommender
+    app["batcher"] = MicroBatcher(
+        lambda key, queries: (bot.respond_many if key[0] == "respond" else bot.search_many)(
+            queries, top_k=key[1], alpha=key[2]),
+        max_batch=max_batch,
+        max_wait=max_wait,
+    )
+
+    async def on_cleanup(app):
+        await app["batcher"].close()
+
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/answer", answer)
+    app.router.add_post("/respond", respond)
+    app.router.add_post("/recommend", recommend)
+    app.router.add_get("/health", health)
+    app.router.add_get("/ready", ready)
+    if admin_token:
+        app.router.add_post("/admin/reload", reload)
+        app.router.add_post("/admin/rollback", rollback)
+    app.router.add_get("/metrics", metrics_endpoint)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP API for the hybrid chatbot.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--bundle", default="data/bundle")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--eager", action="store_true", help="load the models before accepting requests")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="poll the bundle's CURRENT pointer and hot-reload new generations")
+    parser.add_argument("--admin-token", default=os.environ.get("CHATBOT_ADMIN_TOKEN"),
+                        help="enables /admin/reload and /admin/rollback behind this bearer token "
+                             "(default: $CHATBOT_ADMIN_TOKEN; disabled if unset)")
+    args = parser.parse_args()
+
+    bot = HybridChatBot(bundle_dir=args.bundle, lazy=not args.eager)
+    recommender = RecommenderEngine(bundle=bot.bundle)
+    bot.on_reload.append(recommender.reload)
+    if args.watch:
+        bot.watch(args.watch)
+    web.run_app(create_app(bot, recommender, args.max_batch, args.max_wait_ms / 1000, args.admin_token),
+                host=args.host, port=args.port)
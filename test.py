@@ -1,33 +1,30 @@
-from rank import HybridChatBot
-from deep_translator import GoogleTranslator
+import metrics
+with metrics.STARTUP.step("import rank"):
+    from rank import HybridChatBot
+with metrics.STARTUP.step("import translation"):
+    from translation import Catalog, Translator, indian_languages
 # Make sure to import the updated recommender
-from recommender import QuestionRecommender 
+from recommender import RecommenderEngine, RecommenderSession
 
-# --- Language setup (remains the same) ---
-indian_languages = {
-    "Hindi": "hi", "Tamil": "ta", "Telugu": "te", "Kannada": "kn", "Malayalam": "ml",
-    "Marathi": "mr", "Gujarati": "gu", "Punjabi": "pa", "Bengali": "bn", "Odia": "or",
-    "Urdu": "ur", "Assamese": "as", "Konkani": "kok", "Manipuri (Meitei)": "mni",
-    "Sanskrit": "sa", "Kashmiri": "ks", "Dogri": "doi", "Santali": "sat",
-    "Maithili": "mai", "Bodo": "brx", "Nepali": "ne", "English": "en",
-    "French": "fr", "Spanish": "es", "German": "de", "Italian": "it"
-}
+translator = Translator(cache_path="data/translations.sqlite")
 
 def translate_text(text, target_lang, source_lang="auto"):
-    if source_lang == target_lang or target_lang == "en" and source_lang == "auto":
-        return text
-    try:
-        return GoogleTranslator(source=source_lang, target=target_lang).translate(text)
-    except Exception as e:
-        print(f"Translation Error: {e}")
-        return text
+    return translator.translate(text, target_lang, source_lang)
+
+def print_recommendations(header, recommendations, target_lang):
+    # Header and all questions go out as one batch
+    header, *translated = translator.translate_many([header, *recommendations], target_lang)
+    print(header)
+    for i, q_translated in enumerate(translated, 1):
+        print(f"{i}. {q_translated}")
 
 if __name__ == "__main__":
-    bot = HybridChatBot()
-    recommender = QuestionRecommender(
-        faiss_index_path="data/faiss.index",
-        questions_path="data/questions.npy"
-    )
+    # The encoder loads in the background while the user picks a language
+    bot = HybridChatBot(lazy=True)
+    # The recommender shares the bot's memory-mapped bundle instead of loading its own
+    recommender = RecommenderSession(RecommenderEngine(bundle=bot.bundle))
+    # Pre-translated answers, questions and UI strings, if the catalog was built
+    translator.catalog = Catalog(bot.bundle)
 
     print("Available languages:", ", ".join(indian_languages.keys()))
     language_choice = input("Select your language (e.g., Hindi, English, Tamil): ").strip().title()
@@ -36,11 +33,7 @@ if __name__ == "__main__":
 
     # --- Show Initial Recommendations ---
     recommendations = recommender.get_initial_questions() # Use the method to set initial state
-    header = translate_text("💡 Recommended questions: (Type 'back' to return to the previous list)", target_lang=USER_LANGUAGE)
-    print(header)
-    for i, q in enumerate(recommendations, 1):
-        q_translated = translate_text(q, target_lang=USER_LANGUAGE)
-        print(f"{i}. {q_translated}")
+    print_recommendations("💡 Recommended questions: (Type 'back' to return to the previous list)", recommendations, USER_LANGUAGE)
 
     # --- Main Chat Loop ---
     while True:
@@ -57,11 +50,7 @@ if __name__ == "__main__":
             print(translate_text("↩️ Going back...", target_lang=USER_LANGUAGE))
             recommendations = recommender.go_back()
             # Display the previous recommendations
-            header = translate_text("\n💡 Recommended questions:", target_lang=USER_LANGUAGE)
-            print(header)
-            for i, q in enumerate(recommendations, 1):
-                q_translated = translate_text(q, target_lang=USER_LANGUAGE)
-                print(f"{i}. {q_translated}")
+            print_recommendations("\n💡 Recommended questions:", recommendations, USER_LANGUAGE)
             continue # Skip the rest of the loop and wait for new input
 
         query = ""
@@ -71,28 +60,31 @@ if __name__ == "__main__":
         if is_numeric_selection:
             selected_index = int(user_input) - 1
             query = recommendations[selected_index]
-            confirmation_text = f"✅ You selected: {translate_text(query, USER_LANGUAGE)}"
-            print(confirmation_text)
         else:
             query = user_input
             if USER_LANGUAGE != "en":
                 query = translate_text(query, target_lang="en", source_lang=USER_LANGUAGE)
 
-        # --- Get and display answer (This part remains the same) ---
-        results = bot.search(query, top_k=5, alpha=0.8)
+        # --- Get the answer and related questions in one pass ---
+        response = bot.respond(query, top_k=5, alpha=0.8)
+        results = response["results"]
         if not results:
             no_answer_msg = translate_text("I'm sorry, I couldn't find an answer to that.", target_lang=USER_LANGUAGE)
             print(f"Bot: {no_answer_msg}")
             continue
 
+        # --- Update the recommendations, then translate the whole turn in one batch ---
         answer_en = results[0]['answer']
-        answer_translated = translate_text(answer_en, target_lang=USER_LANGUAGE)
+        recommendations = recommender.show(response["recommendations"])
+        # (a selected question is confirmed in the same batch)
+        selected = [query] if is_numeric_selection else []
+        translated = translator.translate_many(
+            [*selected, answer_en, "\n💡 Next recommendations:", *recommendations], USER_LANGUAGE
+        )
+        if selected:
+            print(f"✅ You selected: {translated.pop(0)}")
+        answer_translated, next_header, *recs_translated = translated
         print(f"Bot: {answer_translated}")
-
-        # --- Get and display the next set of recommendations ---
-        recommendations = recommender.recommend(query)
-        next_header = translate_text("\n💡 Next recommendations:", target_lang=USER_LANGUAGE)
         print(next_header)
-        for i, q in enumerate(recommendations, 1):
-            q_translated = translate_text(q, target_lang=USER_LANGUAGE)
+        for i, q_translated in enumerate(recs_translated, 1):
             print(f"{i}. {q_translated}")
\ No newline at end of file
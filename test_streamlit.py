@@ -1,7 +1,9 @@
+import os
 import streamlit as st
-from rank import HybridChatBot
-from deep_translator import GoogleTranslator
-from recommender import QuestionRecommender
+import metrics
+from rank import HybridChatBot, question_key
+from translation import Catalog, Translator
+from recommender import RecommenderEngine, RecommenderSession
 
 st.set_page_config(page_title="Hybrid ChatBot", layout="wide")
 
@@ -13,32 +15,47 @@ indian_languages = {
     "German": "de", "Italian": "it"
 }
 
-@st.cache_data
-def translate_text(text, target_lang, source_lang="auto"):
-    """Translates text, returning original text if translation is not needed or fails."""
-    if not text or source_lang == target_lang or (target_lang == "en" and source_lang == "auto"):
-        return text
-    try:
-        return GoogleTranslator(source=source_lang, target=target_lang).translate(text)
-    except Exception:
-        return text
+@st.cache_resource
+def start_metrics_server():
+    """Exposes /metrics once per process when CHATBOT_METRICS_PORT is set."""
+    port = os.environ.get("CHATBOT_METRICS_PORT")
+    return metrics.start_http_server(int(port)) if port else None
+
+start_metrics_server()
 
 # Load models
 @st.cache_resource
 def load_bot():
-    """Loads the HybridChatBot model."""
-    return HybridChatBot()
+    """Loads the HybridChatBot; the encoder and BM25 load in the background so the first page renders at once."""
+    return HybridChatBot(cache_path="data/query_cache.sqlite", lazy=True)
 
 @st.cache_resource
 def load_recommender():
-    """Loads the QuestionRecommender model."""
-    return QuestionRecommender(
-        faiss_index_path="data/faiss.index",
-        questions_path="data/questions.npy"
-    )
+    """Loads the shared, read-only recommender engine (one per process), on the bot's bundle."""
+    bot = load_bot()
+    engine = RecommenderEngine(bundle=bot.bundle)
+    # New bundle generations are picked up without restarting the app
+    bot.on_reload.append(engine.reload)
+    bot.watch(float(os.environ.get("CHATBOT_RELOAD_INTERVAL", "30")))
+    return engine
 
 bot = load_bot()
 
+@st.cache_resource
+def load_translator():
+    """Loads the shared, disk-cached translator, backed by the bundle's pre-translated catalog."""
+    bot = load_bot()
+    translator = Translator(cache_path="data/translations.sqlite", catalog=Catalog(bot.bundle))
+    # Each generation carries its own catalog; follow the bot to new ones
+    bot.on_reload.append(translator.reload)
+    return translator
+
+translator = load_translator()
+
+def translate_text(text, target_lang, source_lang="auto"):
+    """Translates text, returning original text if translation is not needed or fails."""
+    return translator.translate(text, target_lang, source_lang)
+
 # Core logic function (doesn't modify session state directly)
 def get_bot_response(query_en):
     """
@@ -49,14 +66,22 @@ def get_bot_response(query_en):
     if not query_en:
         return "Please enter a question.", []
 
-    results = bot.search(query_en, top_k=5, alpha=0.8)
+    # Stored questions are answered before the models are up; anything else waits for them
+    if not bot.ready.is_set() and question_key(query_en) not in bot.exact_ids:
+        with st.spinner("Loading the language model..."):
+            bot.wait_ready()
+
+    # One encode + one FAISS search gives both the answer and the related questions
+    response = bot.respond(query_en, top_k=5, alpha=0.8)
+    results = response["results"]
     answer_en = results[0].get('answer') if results else "I'm sorry, I couldn't find an answer."
-    new_recommendations = st.session_state.recommender.recommend(query_en)
+    new_recommendations = st.session_state.recommender.show(response["recommendations"])
     return answer_en, new_recommendations
 
 # --- Session State Initialization ---
 if 'recommender' not in st.session_state:
-    st.session_state.recommender = load_recommender()
+    # Each session gets its own small navigation state over the shared engine
+    st.session_state.recommender = RecommenderSession(load_recommender())
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "user_language" not in st.session_state:
@@ -64,22 +89,17 @@ if "user_language" not in st.session_state:
 if "recommendations" not in st.session_state:
     st.session_state.recommendations = st.session_state.recommender.get_initial_questions()
 
+# English chat messages of this turn, translated below together with the rest of the page
+if "pending_messages" not in st.session_state:
+    st.session_state.pending_messages = []
+
 # Handler for recommended questions (button clicks)
 if "query_for_next_run" in st.session_state:
     query_en = st.session_state.pop("query_for_next_run")
     
-    # Add the user's clicked question to the chat history
-    st.session_state.messages.append({
-        "role": "user",
-        "content": translate_text(query_en, st.session_state.user_language)
-    })
-    
-    # Get and display the bot's response
+    # Queue the user's clicked question and the bot's response for the chat history
     answer_en, new_recs = get_bot_response(query_en)
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": translate_text(answer_en, st.session_state.user_language)
-    })
+    st.session_state.pending_messages += [("user", query_en), ("assistant", answer_en)]
     st.session_state.recommendations = new_recs
 
 
@@ -94,6 +114,24 @@ st.session_state.user_language = indian_languages[selected_language_name]
 st.title("Sat2Farm AI Assistant", anchor=False)
 st.markdown("Ask me anything about Sat2Farm, or select a recommended question below.")
 
+action_items = []
+if st.session_state.recommender.history:
+    action_items.append(("Back to previous questions", "go_back"))
+for rec_en in st.session_state.recommendations:
+    action_items.append((rec_en, rec_en))
+
+# The turn's messages, the header, the chat input placeholder and every button label: one batch per turn
+pending = st.session_state.pending_messages
+translated = translator.translate_many(
+    [*(text_en for _, text_en in pending), "Frequently Asked Questions:", "Type your question here...",
+     *(text_en for text_en, _ in action_items)],
+    st.session_state.user_language
+)
+for (role, _), content in zip(pending, translated):
+    st.session_state.messages.append({"role": role, "content": content})
+rec_header, placeholder, *display_texts = translated[len(pending):]
+pending.clear()
+
 # Display chat messages
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
@@ -101,20 +139,14 @@ for msg in st.session_state.messages:
 
 # --- Recommendations Section ---
 st.markdown("---")
-rec_header = translate_text("Frequently Asked Questions:", st.session_state.user_language)
-st.subheader(rec_header, anchor=False)
 
-action_items = []
-if st.session_state.recommender.history:
-    action_items.append(("Back to previous questions", "go_back"))
-for rec_en in st.session_state.recommendations:
-    action_items.append((rec_en, rec_en))
+st.subheader(rec_header, anchor=False)
 
 num_columns = 3
 cols = st.columns(num_columns)
 for i, (text_en, action_id) in enumerate(action_items):
     col = cols[i % num_columns]
-    display_text = translate_text(text_en, st.session_state.user_language)
+    display_text = display_texts[i]
     key = f"rec_button_{i}_{action_id}"
 
     if col.button(display_text, key=key, use_container_width=True):
@@ -126,7 +158,6 @@ for i, (text_en, action_id) in enumerate(action_items):
 
 # --- Chat Input with Send Symbol ---
 # This widget provides the text box and send button at the bottom of the screen.
-placeholder = translate_text("Type your question here...", st.session_state.user_language)
 if prompt := st.chat_input(placeholder):
     # 1. Add user's original message to the chat display
     st.session_state.messages.append({"role": "user", "content": prompt})
@@ -141,11 +172,8 @@ if prompt := st.chat_input(placeholder):
     # 3. Get the bot's response and new recommendations
     answer_en, new_recs = get_bot_response(query_en)
 
-    # 4. Translate the bot's English answer to the user's language and display
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": translate_text(answer_en, st.session_state.user_language)
-    })
+    # 4. Queue the bot's English answer; the rerun translates it with the rest of the page
+    st.session_state.pending_messages.append(("assistant", answer_en))
 
     # 5. Update the recommendations
     st.session_state.recommendations = new_recs
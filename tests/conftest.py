@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class HashEncoder:
+    """Deterministic bag-of-words encoder standing in for SentenceTransformer in tests."""
+
+    dim = 64
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", backend="torch"):
+        self.model_name = model_name
+        self.backend = backend
+        self.calls = []
+
+    @property
+    def name(self):
+        return f"{self.model_name}:{self.backend}"
+
+    def encode(self, texts, batch_size=32, processes=None):
+        texts = list(texts)
+        self.calls.append(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().replace("?", " ").split():
+                out[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+            norm = np.linalg.norm(out[i])
+            if norm:
+                out[i] /= norm
+        return out
+
+
+def make_faq(groups=10, paraphrases=4):
+    """Small FAQ in the train_data.json shape; each group of paraphrases shares one answer."""
+    from benchmark import make_corpus
+    return make_corpus(groups * paraphrases, paraphrases)
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    import embedding
+    import rank
+    enc = HashEncoder()
+    monkeypatch.setattr(rank, "load_encoder", lambda model_name=None, backend=None: enc)
+    monkeypatch.setattr(embedding, "load_encoder", lambda model_name=None, backend=None: enc)
+    return enc
+
+
+@pytest.fixture
+def faq():
+    return make_faq()
+
+
+@pytest.fixture
+def faq_path(tmp_path, faq):
+    path = tmp_path / "train_data.json"
+    path.write_text(json.dumps(faq), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def bundle_dir(tmp_path, faq_path, encoder):
+    from embedding import EmbeddingStore
+    root = str(tmp_path / "bundle")
+    EmbeddingStore(json_path=faq_path).build_index(bundle_dir=root, incremental=False)
+    return root
+
+
+@pytest.fixture
+def bot(bundle_dir, encoder):
+    from rank import HybridChatBot
+    return HybridChatBot(bundle_dir=bundle_dir)
+
+
+@pytest.fixture
+def new_generation(faq_path, faq, bundle_dir, encoder):
+    """
+    Builds the next bundle generation under bundle_dir from the FAQ plus
+    `extra` new questions ("Brand new question N?" → "New answer N.").
+    Each call adds to the previous one's FAQ; returns the FAQ written.
+    """
+    from embedding import EmbeddingStore
+    written = list(faq)
+
+    def build(extra=1):
+        start = len(written) - len(faq)
+        written.extend({"instruction": f"Brand new question {i}?", "response": f"New answer {i}."}
+                       for i in range(start, start + extra))
+        with open(faq_path, "w", encoding="utf-8") as f:
+            json.dump(written, f)
+        EmbeddingStore(json_path=faq_path).build_index(bundle_dir=bundle_dir)
+        return list(written)
+    return build
@@ -0,0 +1,109 @@
+import json
+import os
+import faiss
+import numpy as np
+import pytest
+from artifacts import (MANIFEST, StringTable, convert_legacy, current_generation, dedupe, list_generations,
+                       load_bundle, rollback_generation, write_bundle, write_generation)
+
+
+def small_bundle(path, n=6, dim=4):
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((n, dim), dtype=np.float32)
+    index = faiss.IndexFlatL2(dim)
+    index.add(embeddings)
+    questions = [f"question {i} ✓" for i in range(n)]
+    answers = [f"answer {i % 2}" for i in range(n)]
+    write_bundle(path, embeddings, questions, answers, index, model_name="m")
+    return embeddings, questions, answers
+
+
+def test_string_table_round_trip(tmp_path):
+    strings = ["", "plain", "हिन्दी", "emoji 💡", "multi\nline"]
+    StringTable.write(str(tmp_path / "t"), strings)
+    table = StringTable.load(str(tmp_path / "t"))
+    assert table.tolist() == strings
+    assert table[-1] == "multi\nline"
+    with pytest.raises(IndexError):
+        table[len(strings)]
+
+
+def test_bundle_round_trip(tmp_path):
+    path = str(tmp_path / "bundle")
+    embeddings, questions, answers = small_bundle(path)
+    bundle = load_bundle(path)
+    assert len(bundle) == len(questions)
+    assert bundle.questions.tolist() == questions
+    assert bundle.answers.tolist() == answers
+    assert bundle.unique_answers.tolist() == ["answer 0", "answer 1"]
+    np.testing.assert_array_equal(bundle.embeddings, embeddings)
+    _, indices = bundle.search(embeddings[:2], 1)
+    assert indices[:, 0].tolist() == [0, 1]
+
+
+def test_bundle_has_no_pickles(tmp_path):
+    path = str(tmp_path / "bundle")
+    small_bundle(path)
+    for name in os.listdir(path):
+        if name.endswith(".npy"):
+            assert np.load(os.path.join(path, name), allow_pickle=False) is not None
+
+
+def test_unknown_format_version_is_refused(tmp_path):
+    path = str(tmp_path / "bundle")
+    small_bundle(path)
+    manifest_file = os.path.join(path, MANIFEST)
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    manifest["format_version"] = 99
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match="Unsupported bundle format"):
+        load_bundle(path)
+
+
+def test_dedupe_keeps_first_seen_order():
+    unique, ids = dedupe(["b", "a", "b", "c"])
+    assert unique == ["b", "a", "c"]
+    assert ids.tolist() == [0, 1, 0, 2]
+
+
+def test_pruning_keeps_live_and_rollback_generations(tmp_path):
+    root = str(tmp_path / "root")
+    embeddings, questions, answers = small_bundle(str(tmp_path / "source"))
+    index = load_bundle(str(tmp_path / "source")).index
+
+    def write():
+        return os.path.basename(write_generation(root, embeddings, questions, answers, index, keep=1))
+
+    first, second = write(), write()
+    assert rollback_generation(root) == first
+    # Servers still run the rolled-back first; rollback_generation() would return second
+    third = write()
+    assert list_generations(root) == [first, second, third]
+    assert rollback_generation(root) == second
+    fourth = write()
+    assert list_generations(root) == [second, third, fourth]
+    fifth = write()
+    assert list_generations(root) == [fourth, fifth]
+    assert current_generation(root) == fifth
+
+
+def test_convert_legacy_adds_a_generation(tmp_path):
+    root = str(tmp_path / "root")
+    embeddings, questions, answers = small_bundle(str(tmp_path / "source"))
+    index = load_bundle(str(tmp_path / "source")).index
+    for _ in range(2):
+        write_generation(root, embeddings, questions, answers, index)
+
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    faiss.write_index(index, str(legacy / "faiss.index"))
+    np.save(legacy / "questions.npy", np.array(questions, dtype=object))
+    np.save(legacy / "answers.npy", np.array(answers, dtype=object))
+    path = convert_legacy(str(legacy), root, num_neighbors=2)
+
+    assert list_generations(root) == ["gen-000001", "gen-000002", "gen-000003"]
+    assert current_generation(root) == os.path.basename(path) == "gen-000003"
+    assert load_bundle(root).questions.tolist() == questions
+    assert rollback_generation(root) == "gen-000002"
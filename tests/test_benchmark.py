@@ -0,0 +1,17 @@
+from benchmark import latency_stats, make_corpus
+
+
+def test_corpus_questions_are_distinct_and_grouped():
+    corpus = make_corpus(200, paraphrases=4)
+    questions = [item["instruction"] for item in corpus]
+    assert len(set(questions)) == len(questions)
+    answers = [item["response"] for item in corpus]
+    assert len(set(answers)) == 50
+    assert answers[0] == answers[3] != answers[4]
+
+
+def test_latency_stats():
+    stats = latency_stats([0.001] * 99 + [0.1])
+    assert stats["p50_ms"] == 1.0
+    assert stats["p99_ms"] > stats["p50_ms"]
+    assert stats["qps"] > 0
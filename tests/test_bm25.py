@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from artifacts import load_bundle
+from bm25 import SparseBM25, tokenize
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return [tokenize(str(q)) for q in load_bundle("data/bundle").questions]
+
+
+def test_scores_match_bm25okapi(corpus):
+    sparse = SparseBM25(corpus)
+    reference = rank_bm25.BM25Okapi(corpus)
+    for query in ["how do i add my farm", "is the app free", "weather forecast accuracy", "unknownword"]:
+        tokens = tokenize(query)
+        np.testing.assert_allclose(sparse.get_scores(tokens), reference.get_scores(tokens), rtol=0, atol=1e-9)
+
+
+def test_top_k_is_best_of_get_scores(corpus):
+    sparse = SparseBM25(corpus)
+    tokens = tokenize("how to add farm in the app")
+    ids, scores = sparse.top_k(tokens, 5)
+    full = sparse.get_scores(tokens)
+    np.testing.assert_allclose(scores, np.sort(full)[::-1][:5])
+    np.testing.assert_allclose(full[ids], scores)
+
+
+def test_top_k_skips_documents_without_query_terms(corpus):
+    ids, scores = SparseBM25(corpus).top_k(["unknownword"], 5)
+    assert len(ids) == 0 and len(scores) == 0
@@ -0,0 +1,45 @@
+import numpy as np
+from cache import EmbeddingCache, normalize
+
+
+def fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+    return encode
+
+
+def test_only_misses_are_encoded_once():
+    calls = []
+    cache = EmbeddingCache(max_size=10)
+    first = cache.encode(fake_encode(calls), ["Hello  World", "hello world", "other"])
+    assert calls == [["Hello  World", "other"]]
+    np.testing.assert_array_equal(first[0], first[1])
+
+    second = cache.encode(fake_encode(calls), ["HELLO WORLD", "other"])
+    assert len(calls) == 1
+    np.testing.assert_array_equal(second, first[1:])
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_size=2)
+    cache.put_many(["a", "b"], np.ones((2, 2)))
+    cache.get("a")
+    cache.put_many(["c"], np.ones((1, 2)))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert len(cache) == 2
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    EmbeddingCache(path=path, namespace="m:torch").put_many(["query"], np.array([[1.0, 2.0]]))
+
+    restarted = EmbeddingCache(path=path, namespace="m:torch")
+    np.testing.assert_array_equal(restarted.get("Query"), [1.0, 2.0])
+    # Another model never sees these vectors
+    assert EmbeddingCache(path=path, namespace="other:torch").get("query") is None
+
+
+def test_normalize_is_case_and_whitespace_insensitive():
+    assert normalize("  How DO\tI  ") == "how do i"
@@ -0,0 +1,45 @@
+import json
+import numpy as np
+from artifacts import load_bundle
+from embedding import EmbeddingStore
+
+
+def rebuild(faq_path, faq, bundle_dir, **kwargs):
+    with open(faq_path, "w", encoding="utf-8") as f:
+        json.dump(faq, f)
+    EmbeddingStore(json_path=faq_path).build_index(bundle_dir=bundle_dir, **kwargs)
+    return load_bundle(bundle_dir)
+
+
+def test_incremental_build_encodes_only_new_and_edited(bundle_dir, faq_path, faq, encoder):
+    before = load_bundle(bundle_dir)
+    faq[0]["instruction"] = "An edited question?"
+    del faq[1]
+    faq.append({"instruction": "A brand new question?", "response": "New answer."})
+    encoder.calls.clear()
+
+    bundle = rebuild(faq_path, faq, bundle_dir)
+    assert encoder.calls == [["An edited question?", "A brand new question?"]]
+    assert bundle.questions.tolist() == [item["instruction"] for item in faq]
+    # Unchanged questions keep their stored vectors
+    np.testing.assert_array_equal(bundle.embeddings[1], before.embeddings[2])
+    np.testing.assert_allclose(bundle.embeddings[0], encoder.encode(["An edited question?"])[0])
+
+
+def test_full_build_reencodes_everything(bundle_dir, faq_path, faq, encoder):
+    encoder.calls.clear()
+    rebuild(faq_path, faq, bundle_dir, incremental=False)
+    assert sum(len(c) for c in encoder.calls) == len(faq)
+
+
+def test_other_backend_does_not_reuse_embeddings(bundle_dir, faq_path, faq, encoder):
+    encoder.backend = "onnx"
+    encoder.calls.clear()
+    rebuild(faq_path, faq, bundle_dir)
+    assert sum(len(c) for c in encoder.calls) == len(faq)
+
+
+def test_neighbour_table_comes_from_the_built_index(bundle_dir, faq_path, faq):
+    bundle = rebuild(faq_path, faq, bundle_dir, index_type="ivf", metric="ip", num_neighbors=5)
+    _, expected = bundle.search(np.asarray(bundle.embeddings), 6)
+    np.testing.assert_array_equal(bundle.neighbors, expected)
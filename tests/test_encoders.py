@@ -0,0 +1,68 @@
+import sys
+import types
+import numpy as np
+import pytest
+import encoders
+from artifacts import load_bundle
+
+
+class RecordingSentenceTransformer:
+    instances = []
+
+    def __init__(self, model_name, **kwargs):
+        self.kwargs = kwargs
+        RecordingSentenceTransformer.instances.append(self)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        return np.zeros((len(texts), 3), dtype=np.float64)
+
+
+@pytest.fixture
+def recording(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = RecordingSentenceTransformer
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    RecordingSentenceTransformer.instances.clear()
+    return RecordingSentenceTransformer.instances
+
+
+def test_torch_backend_keeps_default_device(recording):
+    encoders.Encoder("m", "torch")
+    assert "device" not in recording[0].kwargs
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_backends_run_on_cpu(recording, backend):
+    encoders.Encoder("m", backend)
+    assert recording[0].kwargs["device"] == "cpu"
+    assert recording[0].kwargs["backend"] == "onnx"
+
+
+def test_encode_returns_float32(recording):
+    assert encoders.Encoder("m", "torch").encode(["a", "b"]).dtype == np.float32
+
+
+def test_unknown_backend_is_refused(recording):
+    with pytest.raises(ValueError, match="Unknown encoder backend"):
+        encoders.Encoder("m", "tpu")
+
+
+@pytest.mark.parametrize("backend", [b for b in encoders.BACKENDS if b != "torch"])
+def test_quantized_backends_agree_with_index(backend):
+    # Needs the real model (and onnxruntime for the ONNX backends); skipped where they are unavailable
+    pytest.importorskip("sentence_transformers")
+    if backend.startswith("onnx"):
+        pytest.importorskip("onnxruntime")
+    bundle = load_bundle("data/bundle")
+    try:
+        encoder = encoders.load_encoder(bundle.manifest.get("model_name", "all-MiniLM-L6-v2"), backend)
+    except Exception as e:
+        pytest.skip(f"{backend} encoder unavailable: {e}")
+    agreement, _ = encoders.check_agreement(encoder, bundle, k=5, sample=50)
+    assert agreement >= encoders.AGREEMENT_THRESHOLD
+
+
+def test_check_agreement_of_the_build_encoder_is_perfect(bundle_dir, encoder):
+    agreement, per_text = encoders.check_agreement(encoder, load_bundle(bundle_dir), k=5, sample=10)
+    assert agreement == 1.0
+    assert encoder.calls[-1] and len(encoder.calls[-1]) == 10
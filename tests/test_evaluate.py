@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from evaluate import score_matrices, sweep
+
+
+def test_linear_sweep_matches_bot_search(bot, encoder):
+    bundle = bot.bundle
+    # Typed variants of stored questions (not exact matches, so they go through fusion). Hashed
+    # bag-of-words vectors tie a lot on short unrelated text, and tie order is up to FAISS
+    texts = [f"{q} {suffix}" for q in bundle.questions.tolist() for suffix in ("for my farm today", "in the app")]
+    labels = [int(a) for a in bundle.answer_ids for _ in range(2)]
+    queries = [(text, label, -1) for text, label in zip(texts, labels)]
+    distances, bm25_scores = score_matrices(bundle, queries, encoder)
+
+    for alpha in (0.2, 0.8):
+        thresholds = [0.0, bot.fallback_threshold, 0.5]
+        rows = sweep(bundle, queries, distances, bm25_scores, ["linear"], [alpha], thresholds, top_k=3)
+        answer_ids = {str(a): i for i, a in enumerate(bundle.unique_answers)}
+        for threshold, row in zip(thresholds, rows):
+            bot.fallback_threshold = threshold
+            ranks, fallbacks = [], []
+            for text, label, _ in queries:
+                results = bot.search(text, top_k=3, alpha=alpha)
+                fallbacks.append(results[0]["matched_question"] is None)
+                found = [answer_ids[r["answer"]] for r in results if r["matched_question"] is not None]
+                ranks.append(found.index(label) + 1 if label in found else 0)
+            ranks = np.array(ranks)
+            assert row["fallback_rate"] == np.mean(fallbacks)
+            assert row["recall@1"] == np.mean(ranks == 1)
+            assert row["recall@3"] == np.mean(ranks > 0)
+            assert np.isclose(row["mrr"], np.mean(np.where(ranks > 0, 1.0 / np.maximum(ranks, 1), 0.0)))
+        bot.fallback_threshold = 0.05
+
+
+def test_tail_candidates_do_not_reorder_the_head():
+    # Question 0 leads the embedding list and question 1 the BM25 list. Fused over the full
+    # depth, question 0 would also collect its BM25 score and win; at top_k depth it does not
+    bundle = SimpleNamespace(answer_ids=np.array([0, 1, 1, 1]))
+    distances = np.array([[0.0, 1.0, 3.0, 3.0]])
+    bm25_scores = np.array([[2.9, 3.0, 0.0, 0.0]])
+    queries = [("query", 1, -1)]
+    row, = sweep(bundle, queries, distances, bm25_scores, ["linear"], [0.5], [0.0], top_k=1)
+    assert row["recall@1"] == 1.0
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import expand_data
+
+
+class FakeParaphraser:
+    """Mimics the text2text pipeline's output shapes: flat for one prompt or num_return_sequences=1."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def __call__(self, prompts, num_return_sequences=1, **kwargs):
+        self.prompts.extend(prompts)
+        outputs = [[{"generated_text": f"{p.split(': ', 1)[1]} variant {n}"} for n in range(num_return_sequences)]
+                   for p in prompts]
+        if num_return_sequences == 1:
+            return [out[0] for out in outputs]
+        return outputs[0] if len(outputs) == 1 else outputs
+
+
+@pytest.fixture
+def paraphraser(monkeypatch):
+    fake = FakeParaphraser()
+    monkeypatch.setattr(expand_data, "load_paraphraser", lambda: fake)
+    return fake
+
+
+def expand(tmp_path, pairs, **kwargs):
+    source = tmp_path / "qa.json"
+    source.write_text(json.dumps(pairs))
+    # Fake variants differ in one character; only drop exact duplicates
+    return expand_data.expand_dataset(str(source), str(tmp_path / "out.json"),
+                                      str(tmp_path / "progress.jsonl"), batch_size=2, threshold=1.0, **kwargs)
+
+
+PAIRS = [{"question": f"How do I do task {i}?", "answer": f"Answer {i}"} for i in range(5)]
+
+
+def test_checkpoint_removed_after_success(tmp_path, paraphraser):
+    expanded = expand(tmp_path, PAIRS, num_return=2)
+    assert not (tmp_path / "progress.jsonl").exists()
+    assert {"question": "How do I do task 3? variant 1", "answer": "Answer 3"} in expanded
+    assert json.loads((tmp_path / "out.json").read_text()) == expanded
+
+
+def test_resume_skips_only_unchanged_pairs(tmp_path, paraphraser):
+    # A crashed run left records for the first three pairs (and a torn line)
+    records = expand_data.expand_chunk(
+        [(expand_data.record_key(p["question"], p["answer"]), p) for p in PAIRS[:3]], num_return=2)
+    with open(tmp_path / "progress.jsonl", "w") as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+        f.write('{"key": "torn')
+    paraphraser.prompts.clear()
+
+    # Pair 1 was edited since; its record no longer matches and is expanded again
+    pairs = [dict(p) for p in PAIRS]
+    pairs[1]["answer"] = "Edited answer"
+    expanded = expand(tmp_path, pairs, num_return=2)
+
+    assert paraphraser.prompts == [f"paraphrase: {pairs[i]['question']}" for i in (1, 3, 4)]
+    assert {"question": "How do I do task 1?", "answer": "Edited answer"} in expanded
+    assert all(e["answer"] != "Answer 1" for e in expanded)
+
+
+def test_tampered_records_are_ignored(tmp_path):
+    record = {"key": expand_data.record_key("q", "a"), "question": "q", "answer": "changed", "variants": ["q"]}
+    legacy = {"index": 0, "answer": "a", "variants": ["q"]}
+    path = tmp_path / "progress.jsonl"
+    path.write_text(json.dumps(record) + "\n" + json.dumps(legacy) + "\n")
+    assert expand_data.load_checkpoint(str(path)) == {}
+
+
+@pytest.mark.parametrize("count", [1, 3])
+@pytest.mark.parametrize("num_return", [1, 2])
+def test_generate_paraphrases_groups_by_question(paraphraser, count, num_return):
+    questions = [f"question {i}" for i in range(count)]
+    paraphrases = expand_data.generate_paraphrases(questions, num_return=num_return)
+    assert paraphrases == [[f"{q} variant {n}" for n in range(num_return)] for q in questions]
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from extact import iter_page_texts, iter_qa_pairs
+
+PDF = os.path.join(os.path.dirname(__file__), "..", "data", "SatyuktQueries.pdf")
+
+
+def test_pairs_spanning_page_breaks_are_stitched():
+    pages = [
+        "Q: How do I add a farm? A: Open the farms tab",
+        "and press Add. Q: Where is the",
+        "",
+        "report? A: Under Reports.",
+    ]
+    pairs = [(q.strip(), " ".join(a.split())) for q, a in iter_qa_pairs(pages)]
+    assert pairs == [
+        ("How do I add a farm?", "Open the farms tab and press Add."),
+        ("Where is the\nreport?", "Under Reports."),
+    ]
+
+
+def test_stitching_matches_single_page():
+    pages = ["Q: one? A: first", "answer Q: two? A: second"]
+    assert [q for q, _ in iter_qa_pairs(pages)] == [q for q, _ in iter_qa_pairs(["\n".join(pages)])]
+
+
+@pytest.mark.skipif(not os.path.exists(PDF), reason="sample PDF not available")
+def test_parallel_extraction_keeps_page_order():
+    serial = list(iter_page_texts(PDF, workers=1, chunk_pages=2))
+    assert list(iter_page_texts(PDF, workers=2, chunk_pages=2)) == serial
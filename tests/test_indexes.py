@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import faiss
+from artifacts import load_bundle, write_bundle
+from indexes import INDEX_TYPES, make_index, prepare_vectors
+
+
+@pytest.fixture(scope="module")
+def embeddings():
+    return np.asarray(load_bundle("data/bundle").embeddings)
+
+
+def test_unknown_index_type_is_refused(embeddings):
+    with pytest.raises(ValueError, match="Unknown index type"):
+        make_index(embeddings, "lsh")
+
+
+@pytest.mark.parametrize("index_type", ["ivf", "hnsw"])
+def test_approximate_indexes_recall(embeddings, index_type):
+    queries = embeddings[::7]
+    _, truth = make_index(embeddings, "flat")[0].search(queries, 10)
+    _, found = make_index(embeddings, index_type)[0].search(queries, 10)
+    recall = np.mean([len(set(t) & set(f)) / 10 for t, f in zip(truth, found)])
+    assert recall >= 0.9
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_bundle_search_returns_l2_distances_for_every_metric(tmp_path, embeddings, index_type):
+    for metric in ("l2", "ip"):
+        path = str(tmp_path / f"{index_type}-{metric}")
+        index, params = make_index(embeddings, index_type, metric)
+        questions = [f"q{i}" for i in range(len(embeddings))]
+        write_bundle(path, embeddings, questions, questions, index,
+                     index_type=index_type, metric=metric, index_params=params)
+        bundle = load_bundle(path)
+        distances, indices = bundle.search(embeddings[:5], 3)
+        assert (distances >= 0).all()
+        if index_type == "flat":
+            vectors = prepare_vectors(embeddings, metric)
+            expected = ((vectors[indices[:, 0]] - vectors[:5]) ** 2).sum(axis=1)
+            np.testing.assert_allclose(distances[:, 0], expected, atol=1e-4)
+        if "nprobe" in params:
+            assert faiss.extract_index_ivf(bundle.index).nprobe == params["nprobe"]
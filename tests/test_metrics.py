@@ -0,0 +1,46 @@
+from metrics import Registry, StartupProfile, trace
+
+
+def test_render_types_every_family_once():
+    registry = Registry()
+    registry.inc("search_queries_total", 3)
+    registry.inc("http_requests_total", endpoint="answer")
+    registry.inc("http_requests_total", endpoint="respond")
+    registry.observe("search_seconds", 0.003)
+    registry.observe("search_seconds", 0.3)
+    lines = registry.render().splitlines()
+
+    assert lines.count("# TYPE http_requests_total counter") == 1
+    assert lines.count("# TYPE search_queries_total counter") == 1
+    assert lines.count("# TYPE search_seconds histogram") == 1
+    assert lines.index("# TYPE http_requests_total counter") < lines.index('http_requests_total{endpoint="answer"} 1')
+    assert "search_queries_total 3" in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    for seconds in (0.0004, 0.003, 20.0):
+        registry.observe("latency_seconds", seconds)
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{le="0.0005"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.005"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_count 3" in lines
+
+
+def test_unsampled_trace_records_nothing():
+    t = trace("quiet", sample_rate=0.0)
+    with t.stage("work"):
+        pass
+    t.finish()
+    assert t.stages == {}
+
+
+def test_startup_profile_keeps_step_order():
+    profile = StartupProfile()
+    with profile.step("first"):
+        pass
+    with profile.step("second"):
+        pass
+    assert [s["step"] for s in profile.report()] == ["first", "second"]
+    assert "second" in profile.format()
@@ -0,0 +1,119 @@
+import threading
+
+import numpy as np
+import pytest
+
+import rank
+from bm25 import SparseBM25, tokenize
+from rank import HybridChatBot, question_key
+
+
+def test_search_many_matches_search(bot, faq):
+    queries = ["how do i add my farm", "share the crop report", "delete account please", "zzz unknown"]
+    batched = bot.search_many(queries, top_k=3, alpha=0.8)
+    assert batched == [bot.search(q, top_k=3, alpha=0.8) for q in queries]
+
+
+def reference_search(bundle, encoder, query, top_k, alpha):
+    # The original per-query HybridChatBot.search, on the bundle's index and a fresh BM25
+    distances, indices = bundle.search(encoder.encode([query]), top_k)
+    embedding_scores = {idx: 1/(1+dist) for idx, dist in zip(indices[0], distances[0])}
+    bm25_scores = SparseBM25([tokenize(str(q)) for q in bundle.questions]).get_scores(tokenize(query))
+    bm25_top = np.argsort(bm25_scores)[::-1][:top_k]
+    bm25_scores = {idx: bm25_scores[idx] for idx in bm25_top}
+    combined_scores = {}
+    for idx in set(list(embedding_scores.keys()) + list(bm25_scores.keys())):
+        combined_scores[idx] = alpha * bm25_scores.get(idx, 0) + (1 - alpha) * embedding_scores.get(idx, 0)
+    best = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+    return [(str(bundle.questions[idx]), score) for idx, score in best[:top_k]]
+
+
+@pytest.mark.parametrize("alpha", [0.0, 0.5, 0.8, 1.0])
+def test_batched_search_matches_reference(bot, encoder, alpha):
+    bot.fallback_threshold = 0.0
+    queries = ["how do i add my farm", "share the crop report", "delete account please", "reset my password now"]
+    for query, results in zip(queries, bot.search_many(queries, top_k=3, alpha=alpha, collapse=False)):
+        expected = reference_search(bot.bundle, encoder, query, 3, alpha)
+        scores = [r["score"] for r in results]
+        np.testing.assert_allclose(scores, [score for _, score in expected], rtol=1e-6)
+        # Candidates tied with the last kept score may be cut differently (argsort order vs SparseBM25's)
+        above = [i for i, score in enumerate(scores) if score > scores[-1] + 1e-9]
+        assert [results[i]["matched_question"] for i in above] == [expected[i][0] for i in above]
+
+
+def test_search_many_empty(bot):
+    assert bot.search_many([]) == []
+
+
+QUERIES = ["how do i add my farm", "share the crop report", "delete account please", "reset my password now"]
+
+
+def test_collapse_keeps_fused_ranking(bot):
+    for query in QUERIES:
+        plain = bot.search(query, top_k=3, collapse=False)
+        collapsed = bot.search(query, top_k=3, collapse=True)
+        assert collapsed[0] == plain[0]
+        # Every answer the plain ranking lists first shows up in the same order
+        firsts = list(dict.fromkeys(r["answer"] for r in plain))
+        assert [r["answer"] for r in collapsed[:len(firsts)]] == firsts
+
+
+def test_collapse_fills_distinct_answers(bot):
+    for query in QUERIES:
+        results = bot.search(query, top_k=5, collapse=True)
+        answers = [r["answer"] for r in results]
+        assert len(answers) == len(set(answers)) == 5
+
+
+def test_exact_match_skips_encoder(bot, encoder):
+    question = str(bot.questions[7])
+    calls = len(encoder.calls)
+    for variant in (question, f"  {question.upper()} ", question.rstrip("?") + "?!"):
+        result = bot.search(variant, top_k=3)
+        assert result == [{"matched_question": bot.questions[7], "answer": bot.answers[7], "score": 1.0}]
+    assert len(encoder.calls) == calls
+
+
+def test_exact_and_searched_queries_share_a_batch(bot):
+    question = str(bot.questions[3])
+    batched = bot.search_many([question, "share the crop report"], top_k=3)
+    assert batched[0][0]["score"] == 1.0
+    assert batched[1] == bot.search("share the crop report", top_k=3)
+
+
+def test_exact_matches_get_full_recommendations(bot):
+    # A bundle with a narrow neighbour table (like ones built before it was widened)
+    bot.bundle.neighbors = np.asarray(bot.bundle.neighbors)[:, :4]
+    for question in bot.questions:
+        response = bot.respond(str(question), num_recommendations=5)
+        answers = {bot.answers[bot.exact_ids[question_key(q)]] for q in response["recommendations"]}
+        assert len(answers) == len(response["recommendations"]) == 5
+        assert response["results"][0]["answer"] not in answers
+
+
+def test_lazy_bot_answers_stored_questions_before_ready(bundle_dir, encoder, monkeypatch):
+    release = threading.Event()
+
+    def slow_load_encoder(*args, **kwargs):
+        release.wait(5)
+        return encoder
+
+    monkeypatch.setattr(rank, "load_encoder", slow_load_encoder)
+    bot = HybridChatBot(bundle_dir=bundle_dir, lazy=True)
+    question = str(bot.questions[2])
+    assert bot.search(question)[0]["score"] == 1.0
+    assert not bot.wait_ready(timeout=0.01)
+
+    release.set()
+    assert bot.wait_ready(timeout=5)
+    assert bot.search("share the crop report")[0]["matched_question"] is not None
+
+
+def test_lazy_load_error_surfaces_on_search(bundle_dir, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("model missing")
+
+    monkeypatch.setattr(rank, "load_encoder", broken)
+    bot = HybridChatBot(bundle_dir=bundle_dir, lazy=True)
+    with pytest.raises(RuntimeError, match="model missing"):
+        bot.search("share the crop report")
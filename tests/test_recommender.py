@@ -0,0 +1,59 @@
+import numpy as np
+from artifacts import load_bundle
+from recommender import QuestionRecommender, RecommenderEngine, RecommenderSession
+
+
+def index_similar(bundle, question, top_k):
+    # What the recommender computed per request before the neighbour table
+    idx = [str(q) for q in bundle.questions].index(question)
+    _, indices = bundle.index.search(np.asarray(bundle.embeddings[idx:idx + 1]), top_k + 1)
+    return [bundle.questions[i] for i in indices[0] if bundle.questions[i] != question][:top_k]
+
+
+def test_similar_matches_index_search(bundle_dir):
+    engine = RecommenderEngine(bundle_dir, top_k=5)
+    for question in engine.questions:
+        assert engine.similar(question) == index_similar(engine.bundle, question, 5)
+
+
+def test_unknown_question_returns_none(bundle_dir):
+    assert RecommenderEngine(bundle_dir).similar("not a stored question") is None
+
+
+def test_missing_neighbour_table_is_rebuilt(bundle_dir):
+    bundle = load_bundle(bundle_dir)
+    bundle.neighbors = None
+    engine = RecommenderEngine(bundle=bundle, top_k=3)
+    question = str(bundle.questions[0])
+    assert engine.similar(question) == index_similar(bundle, question, 3)
+
+
+def test_history_and_back(bundle_dir):
+    recommender = QuestionRecommender(bundle_dir)
+    start = recommender.get_initial_questions()
+    first = recommender.recommend(str(recommender.engine.questions[0]))
+    recommender.recommend(first[0])
+    assert recommender.go_back() == first
+    assert recommender.go_back() == start
+
+
+def test_sessions_share_engine_but_not_history(bundle_dir):
+    engine = RecommenderEngine(bundle_dir, top_k=3)
+    alice, bob = RecommenderSession(engine), RecommenderSession(engine)
+    alice.get_initial_questions()
+    bob.get_initial_questions()
+
+    first = alice.recommend(str(engine.questions[0]))
+    assert bob.current_recommendations == bob.start_questions
+    bob.recommend(str(engine.questions[5]))
+    assert alice.current_recommendations == first
+    assert len(alice.history) == len(bob.history) == 1
+
+
+def test_engine_reload_reaches_every_session(bundle_dir):
+    engine = RecommenderEngine(bundle_dir, top_k=3)
+    session = RecommenderSession(engine)
+    bundle = load_bundle(bundle_dir)
+    engine.reload(bundle)
+    assert session.engine.bundle is bundle
+    assert session.similar(str(bundle.questions[0])) == index_similar(bundle, str(bundle.questions[0]), 3)
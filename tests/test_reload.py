@@ -0,0 +1,125 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import metrics
+import rank
+from artifacts import CURRENT, MANIFEST, current_generation, load_bundle
+from rank import HybridChatBot
+
+
+def test_reload_serves_new_generation(bot, new_generation):
+    old = bot.snapshot.generation
+    new_generation()
+    assert bot.reload() != old
+    assert bot.search("Brand new question 0?")[0]["answer"] == "New answer 0."
+    assert bot.previous.generation == old
+
+
+def test_reload_accepts_bundle_from_agreeing_backend(bot, new_generation, bundle_dir, encoder, monkeypatch):
+    # A quantized query encoder serving an index built at full precision
+    new_generation()
+    monkeypatch.setattr(encoder, "backend", "onnx-int8")
+    assert load_bundle(bundle_dir).manifest["encoder_backend"] == "torch"
+    assert bot.reload() == current_generation(bundle_dir)
+
+
+class ShuffledEncoder:
+    """Same dimension as the bundle, unrelated vectors."""
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.name = "shuffled"
+        self.permutation = np.random.default_rng(0).permutation(encoder.dim)
+
+    def encode(self, texts, **kwargs):
+        return self.encoder.encode(texts, **kwargs)[:, self.permutation]
+
+
+def test_reload_rejects_disagreeing_encoder(bot, new_generation, encoder):
+    old = bot.snapshot.generation
+    new_generation()
+    bot.model = ShuffledEncoder(encoder)
+    with pytest.raises(ValueError, match="agrees"):
+        bot.reload()
+    assert bot.snapshot.generation == old
+
+
+def test_startup_runs_the_reload_check(bundle_dir, encoder, monkeypatch):
+    monkeypatch.setattr(rank, "load_encoder", lambda *args, **kwargs: ShuffledEncoder(encoder))
+    with pytest.raises(ValueError, match="agrees"):
+        HybridChatBot(bundle_dir=bundle_dir)
+
+
+def test_failing_callback_keeps_old_snapshot(bot, new_generation):
+    seen = []
+
+    def broken(bundle):
+        raise RuntimeError("callback failed")
+
+    bot.on_reload += [lambda bundle: seen.append(bundle.generation), broken]
+    old = bot.snapshot.generation
+    new_generation()
+    with pytest.raises(ValueError, match="callback failed"):
+        bot.reload()
+    assert bot.snapshot.generation == old and bot.previous is None
+    # The callback that had switched was switched back
+    assert seen[-1] == old and len(seen) == 2
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_rollback_persists_across_watch_ticks(bot, new_generation, bundle_dir):
+    old = bot.snapshot.generation
+    new_generation()
+    new = bot.reload()
+    assert bot.rollback() == old
+    assert current_generation(bundle_dir) == old
+
+    bot.watch(interval=0.01)
+    time.sleep(0.1)
+    assert bot.snapshot.generation == old
+
+    # A later build is still picked up
+    new_generation()
+    assert wait_for(lambda: bot.snapshot.generation not in (old, new))
+
+
+def test_rollback_leaves_pointer_if_callback_fails(bot, new_generation, bundle_dir):
+    new_generation()
+    new = bot.reload()
+
+    def broken(bundle):
+        raise RuntimeError("callback failed")
+
+    bot.on_reload.append(broken)
+    with pytest.raises(RuntimeError):
+        bot.rollback()
+    assert bot.snapshot.generation == current_generation(bundle_dir) == new
+
+
+@pytest.mark.parametrize("manifest", [None, "{not json"])
+def test_unloadable_generation_is_rejected(bot, bundle_dir, manifest):
+    # CURRENT names a generation whose directory is missing or whose manifest is corrupt
+    generation = "gen-000099"
+    if manifest is not None:
+        (Path(bundle_dir) / generation).mkdir()
+        (Path(bundle_dir) / generation / MANIFEST).write_text(manifest)
+    (Path(bundle_dir) / CURRENT).write_text(generation + "\n")
+    old = bot.snapshot.generation
+    rejected = metrics.REGISTRY.value("reload_total", outcome="rejected")
+
+    with pytest.raises(ValueError, match=generation):
+        bot.reload()
+    assert generation in bot.rejected
+    assert metrics.REGISTRY.value("reload_total", outcome="rejected") == rejected + 1
+    assert bot.snapshot.generation == old
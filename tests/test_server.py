@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from recommender import RecommenderEngine
+from server import MicroBatcher, create_app
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+
+    def batch_fn(key, items):
+        calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(batch_fn, max_batch=32, max_wait=0.05)
+        results = await asyncio.gather(*(batcher.submit("k", i) for i in range(10)),
+                                       batcher.submit("other", 0))
+        await batcher.close()
+        return results
+
+    results = run(scenario())
+    assert results == [f"k:{i}" for i in range(10)] + ["other:0"]
+    assert sorted(calls) == [("k", list(range(10))), ("other", [0])]
+
+
+def test_batch_errors_reach_every_caller():
+    def batch_fn(key, items):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        batcher = MicroBatcher(batch_fn, max_wait=0.01)
+        results = await asyncio.gather(batcher.submit("k", 1), batcher.submit("k", 2), return_exceptions=True)
+        await batcher.close()
+        return results
+
+    assert all(isinstance(r, RuntimeError) for r in run(scenario()))
+
+
+@pytest.fixture
+def post(bot):
+    recommender = RecommenderEngine(bundle=bot.bundle)
+
+    def post(path, payload, admin_token=None, headers=None):
+        async def scenario():
+            # One app per event loop
+            app = create_app(bot, recommender, max_wait=0.001, admin_token=admin_token)
+            async with TestClient(TestServer(app)) as client:
+                response = await client.post(path, json=payload, headers=headers)
+                body = await response.json() if response.status == 200 else await response.text()
+                return response.status, body
+        return run(scenario())
+    return post
+
+
+def test_answer_matches_search(post, bot):
+    status, body = post("/answer", {"query": "how do i add my farm", "top_k": 3, "alpha": 0.5})
+    assert status == 200
+    assert body["results"] == bot.search("how do i add my farm", top_k=3, alpha=0.5)
+
+
+def test_respond_falls_back_to_start_questions(post, bot):
+    bot.fallback_threshold = 100.0
+    status, body = post("/respond", {"query": "zzz qqq"})
+    assert status == 200
+    assert body["results"][0]["matched_question"] is None
+    assert body["recommendations"] == list(RecommenderEngine(bundle=bot.bundle).start_questions)
+
+
+@pytest.mark.parametrize("payload, message", [
+    ({"query": ""}, "query is required"),
+    ({"query": "farm", "top_k": 0}, "top_k"),
+    ({"query": "farm", "top_k": "five"}, "top_k"),
+    ({"query": "farm", "top_k": 1000}, "top_k"),
+    ({"query": "farm", "alpha": "high"}, "alpha"),
+    ({"query": "farm", "alpha": 1.5}, "alpha"),
+    ({"query": "farm", "alpha": float("nan")}, "alpha"),
+    (["not", "an", "object"], "JSON object"),
+])
+def test_invalid_parameters_are_rejected(post, payload, message):
+    for path in ("/answer", "/respond"):
+        status, body = post(path, payload)
+        assert status == 400
+        assert message in body
+
+
+def test_admin_endpoints_need_a_token(post):
+    assert post("/admin/reload", {})[0] == 404
+    assert post("/admin/reload", {}, admin_token="secret")[0] == 401
+    assert post("/admin/rollback", {}, admin_token="secret", headers={"Authorization": "Bearer wrong"})[0] == 401
+
+
+def test_admin_reload_and_rollback(post, bot, new_generation):
+    auth = {"admin_token": "secret", "headers": {"Authorization": "Bearer secret"}}
+    old = bot.snapshot.generation
+    new_generation()
+    status, body = post("/admin/reload", {}, **auth)
+    assert status == 200 and body["generation"] != old
+    status, body = post("/admin/rollback", {}, **auth)
+    assert status == 200 and body["generation"] == old == bot.snapshot.generation
+    assert post("/admin/rollback", {}, **auth)[0] == 200
@@ -0,0 +1,82 @@
+import json
+
+from artifacts import load_bundle
+from translation import UI_STRINGS, Catalog, Translator, build_catalog, needs_translation
+
+
+class Backend:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    def __call__(self, text, source_lang, target_lang):
+        self.calls.append(text)
+        if text in self.fail:
+            raise RuntimeError("offline")
+        return f"[{target_lang}]{text}"
+
+
+def test_translate_many_keeps_order_and_duplicates():
+    backend = Backend()
+    out = Translator(backend).translate_many(["a", "b", "a", ""], "hi")
+    assert out == ["[hi]a", "[hi]b", "[hi]a", ""]
+    assert sorted(backend.calls) == ["a", "b"]
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "translations.sqlite")
+    Translator(Backend(), cache_path=path).translate_many(["hello"], "ta")
+    backend = Backend()
+    assert Translator(backend, cache_path=path).translate("hello", "ta") == "[ta]hello"
+    assert backend.calls == []
+
+
+def test_failures_return_original_and_are_retried():
+    backend = Backend(fail={"x"})
+    translator = Translator(backend)
+    assert translator.translate_many(["x", "y"], "hi") == ["x", "[hi]y"]
+    backend.fail.clear()
+    assert translator.translate("x", "hi") == "[hi]x"
+
+
+def test_english_target_needs_no_call():
+    backend = Backend()
+    assert Translator(backend).translate("hello", "en") == "hello"
+    assert backend.calls == []
+    assert not needs_translation("en") and needs_translation("en", "hi")
+
+
+def test_catalog_serves_prebuilt_translations(bundle_dir):
+    bundle = load_bundle(bundle_dir)
+    question, answer = str(bundle.questions[0]), str(bundle.unique_answers[1])
+    failed = str(bundle.questions[1])
+    build_catalog(bundle, Translator(Backend(fail={failed})), languages=["hi", "ta"])
+
+    backend = Backend()
+    translator = Translator(backend, catalog=Catalog(bundle))
+    texts = [question, answer, UI_STRINGS[0], failed, "typed by a user"]
+    assert translator.translate_many(texts, "ta") == [f"[ta]{t}" for t in texts]
+    # Only the entry that failed at build time and the unknown text go to the backend
+    assert sorted(backend.calls) == sorted([failed, "typed by a user"])
+
+
+def test_catalog_for_another_bundle_is_ignored(bundle_dir):
+    bundle = load_bundle(bundle_dir)
+    build_catalog(bundle, Translator(Backend()), languages=["hi"])
+    stale = Catalog(bundle)
+    stale.manifest["count"] += 1
+    with open(f"{stale.path}/manifest.json", "w") as f:
+        json.dump(stale.manifest, f)
+    catalog = Catalog(bundle)
+    assert catalog.languages == [] and catalog.lookup(str(bundle.questions[0]), "hi") is None
+
+
+def test_reload_switches_to_new_generation_catalog(bot, bundle_dir, new_generation):
+    translator = Translator(Backend(), catalog=Catalog(bot.bundle))
+    bot.on_reload.append(translator.reload)
+    new_generation()
+    build_catalog(load_bundle(bundle_dir), Translator(Backend()), languages=["hi"])
+
+    bot.reload()
+    assert translator.catalog.path.startswith(bot.bundle.path)
+    assert translator.catalog.lookup("Brand new question 0?", "hi") == "[hi]Brand new question 0?"
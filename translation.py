@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from artifacts import StringTable, load_bundle
+import metrics
+
+indian_languages = {
+    "Hindi": "hi", "Tamil": "ta", "Telugu": "te", "Kannada": "kn", "Malayalam": "ml",
+    "Marathi": "mr", "Gujarati": "gu", "Punjabi": "pa", "Bengali": "bn", "Odia": "or",
+    "Urdu": "ur", "Assamese": "as", "Konkani": "kok", "Manipuri (Meitei)": "mni",
+    "Sanskrit": "sa", "Kashmiri": "ks", "Dogri": "doi", "Santali": "sat",
+    "Maithili": "mai", "Bodo": "brx", "Nepali": "ne", "English": "en",
+    "French": "fr", "Spanish": "es", "German": "de", "Italian": "it"
+}
+
+# Fixed strings shown by test.py, test_streamlit.py and HybridChatBot; pre-translated with the catalog
+UI_STRINGS = (
+    "💡 Recommended questions: (Type 'back' to return to the previous list)",
+    "\n💡 Recommended questions:",
+    "\n💡 Next recommendations:",
+    "\nYou:",
+    "👋 Goodbye!",
+    "↩️ Going back...",
+    "I'm sorry, I couldn't find an answer to that.",
+    "I'm sorry, I couldn't find an answer.",
+    "Sorry, I couldn't find a reliable answer. Please contact our support team.",
+    "Please enter a question.",
+    "Frequently Asked Questions:",
+    "Back to previous questions",
+    "Type your question here...",
+)
+
+CATALOG_DIR = "i18n"
+
+
+def needs_translation(target_lang, source_lang="auto"):
+    return not (source_lang == target_lang or target_lang == "en" and source_lang == "auto")
+
+
+class GoogleBackend:
+    """Default backend: one deep_translator call per string."""
+
+    def __call__(self, text, source_lang, target_lang):
+        from deep_translator import GoogleTranslator
+        return GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+
+
+class Translator:
+    """
+    Translation with a persistent cache and concurrent fan-out.
+
+    backend is any callable (text, source_lang, target_lang) -> str, so tests
+    and offline builds can pass a local stand-in instead of Google Translate.
+    Translations are cached in SQLite keyed by (text, source, target); the
+    misses of one translate_many() call are sent concurrently on a thread pool,
+    so a whole chat turn costs at most one round-trip of latency.
+    """
+
+    def __init__(self, backend=None, cache_path=None, max_workers=8, catalog=None):
+        self.backend = backend or GoogleBackend()
+        self.max_workers = max_workers
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(cache_path or ":memory:", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "text TEXT, source TEXT, target TEXT, translated TEXT, "
+            "PRIMARY KEY (text, source, target))"
+        )
+        self._db.commit()
+
+    def reload(self, bundle):
+        """Switches to bundle's catalog (e.g. as a HybridChatBot.on_reload callback)."""
+        self.catalog = Catalog(bundle)
+
+    def translate(self, text, target_lang, source_lang="auto"):
+        return self.translate_many([text], target_lang, source_lang)[0]
+
+    def translate_many(self, texts, target_lang, source_lang="auto"):
+        texts = list(texts)
+        if not needs_translation(target_lang, source_lang):
+            return texts
+        trace = metrics.trace("translate")
+
+        # Pre-translated catalog first: English source text with a known id needs no lookup or call
+        results = {}
+        if self.catalog is not None and source_lang in ("auto", "en"):
+            for text in set(texts):
+                translated = self.catalog.lookup(text, target_lang)
+                if translated is not None:
+                    results[text] = translated
+            metrics.inc("translation_catalog_hits_total", len(results))
+
+        with trace.stage("cache"), self._lock:
+            for text in set(t for t in texts if t and t not in results):
+                row = self._db.execute(
+                    "SELECT translated FROM translations WHERE text = ? AND source = ? AND target = ?",
+                    (text, source_lang, target_lang),
+                ).fetchone()
+                if row is not None:
+                    results[text] = row[0]
+
+        missing = [t for t in dict.fromkeys(texts) if t and t not in results]
+        metrics.inc("translation_cache_hits_total", len(set(t for t in texts if t)) - len(missing))
+        metrics.inc("translation_cache_misses_total", len(missing))
+        if missing:
+            with trace.stage("backend"):
+                if len(missing) == 1:
+                    fresh = [self._call(missing[0], source_lang, target_lang)]
+                else:
+                    with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                        fresh = list(pool.map(lambda t: self._call(t, source_lang, target_lang), missing))
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                    [(t, source_lang, target_lang, out) for t, out in zip(missing, fresh) if out is not None],
+                )
+                self._db.commit()
+            for text, out in zip(missing, fresh):
+                results[text] = out if out is not None else text
+
+        trace.finish(texts=len(texts), translated=len(missing), target=target_lang)
+        return [results.get(t, t) for t in texts]
+
+    def _call(self, text, source_lang, target_lang):
+        # Failures are not cached, so the next turn retries them
+        try:
+            return self.backend(text, source_lang, target_lang)
+        except Exception as e:
+            metrics.inc("translation_errors_total")
+            print(f"Translation Error: {e}")
+            return None
+
+
+class Catalog:
+    """
+    Offline translations of the whole bundle (questions, unique answers and
+    UI_STRINGS), built by build_catalog(). Each language is a pair of
+    memory-mapped StringTables indexed by question id / answer id, so serving
+    a translation is a dict lookup plus a slice.
+    """
+
+    def __init__(self, bundle, path=None):
+        self.path = path or os.path.join(bundle.path, CATALOG_DIR)
+        self.manifest = {"languages": []}
+        manifest_file = os.path.join(self.path, "manifest.json")
+        if os.path.exists(manifest_file):
+            with open(manifest_file, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("count") == len(bundle) and manifest.get("unique_answers") == len(bundle.unique_answers):
+                self.manifest = manifest
+            else:
+                print("⚠️ Translation catalog does not match the bundle; rebuild it with translation.py")
+
+        self.ids = {}
+        if self.manifest["languages"]:
+            for i, q in enumerate(bundle.questions):
+                self.ids.setdefault(("questions", q), i)
+            for i, a in enumerate(bundle.unique_answers):
+                self.ids.setdefault(("answers", a), i)
+            for i, s in enumerate(self.manifest.get("ui_strings", [])):
+                self.ids.setdefault(("ui", s), i)
+        self._tables = {}
+
+    @property
+    def languages(self):
+        return list(self.manifest["languages"])
+
+    def _table(self, lang, kind):
+        key = (lang, kind)
+        if key not in self._tables:
+            self._tables[key] = StringTable.load(os.path.join(self.path, lang, kind))
+        return self._tables[key]
+
+    def lookup(self, text, lang):
+        """Translation of a known English string, or None if it is not in the catalog."""
+        if lang not in self.manifest["languages"]:
+            return None
+        for kind in ("questions", "answers", "ui"):
+            i = self.ids.get((kind, text))
+            if i is not None:
+                # Empty entries are strings whose translation failed at build time
+                return self._table(lang, kind)[i] or None
+        return None
+
+
+def build_catalog(bundle, translator, languages=None, ui_strings=UI_STRINGS):
+    """
+    Pre-translates every stored question, unique answer and UI string into
+    each language (default: all of indian_languages) and writes the catalog
+    under <bundle>/i18n. translator is a Translator, so any backend works,
+    including a local stand-in.
+    """
+    languages = [lang for lang in (languages or indian_languages.values()) if lang != "en"]
+    tables = {
+        "questions": bundle.questions.tolist(),
+        "answers": bundle.unique_answers.tolist(),
+        "ui": list(ui_strings),
+    }
+    path = os.path.join(bundle.path, CATALOG_DIR)
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    for lang in languages:
+        os.makedirs(os.path.join(tmp, lang))
+        for kind, texts in tables.items():
+            translated = translator.translate_many(texts, lang, source_lang="en")
+            # Untranslated entries come back unchanged; store them empty so serving falls back to live translation
+            StringTable.write(os.path.join(tmp, lang, kind),
+                              ["" if out == text else out for text, out in zip(texts, translated)])
+        print(f"Catalog: {lang} done")
+
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "languages": languages,
+            "count": len(bundle),
+            "unique_answers": len(bundle.unique_answers),
+            "ui_strings": list(ui_strings),
+        }, f, indent=2, ensure_ascii=False)
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-translate the bundle's questions, answers and UI strings.")
+    parser.add_argument("--bundle", default="data/bundle")
+    parser.add_argument("--languages", help="comma-separated language codes (default: all)")
+    parser.add_argument("--cache", default="data/translations.sqlite")
+    args = parser.parse_args()
+
+    languages = args.languages.split(",") if args.languages else None
+    path = build_catalog(load_bundle(args.bundle), Translator(cache_path=args.cache), languages)
+    print(f"Translation catalog saved → {path}")